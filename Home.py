@@ -10,6 +10,9 @@ from utils.data_processing import (
    calcular_total_exportacao,
    calcular_total_cabotagem
 )
+from utils import datasets
+from utils.atualizacao import iniciar_atualizacao_periodica, formatar_idade
+from utils.filtros import estatisticas_cache
 from style import apply_styles
 
 st.set_page_config(
@@ -231,49 +234,6 @@ def carregar_logo():
        st.error(f"Erro ao carregar logo: {str(e)}")
        return None
 
-@st.cache_data
-def carregar_dados_exportacao():
-   try:
-       file_id = st.secrets["urls"]["planilha_exportacao"]
-       url = f"https://docs.google.com/spreadsheets/d/{file_id}/export?format=xlsx"
-       response = requests.get(url)
-       response.raise_for_status()
-       return pd.read_excel(BytesIO(response.content))
-   except Exception as e:
-       st.error(f"Erro ao carregar dados de exportação: {e}")
-       return pd.DataFrame()
-
-@st.cache_data
-def carregar_dados_importacao():
-   try:
-       file_id = st.secrets["urls"]["planilha_importacao"]
-       url = f"https://docs.google.com/spreadsheets/d/{file_id}/export?format=xlsx"
-       response = requests.get(url)
-       response.raise_for_status()
-       return pd.read_excel(BytesIO(response.content))
-   except Exception as e:
-       st.error(f"Erro ao carregar dados de importação: {e}")
-       return pd.DataFrame()
-
-@st.cache_data
-def carregar_dados_cabotagem():
-   try:
-       file_id = st.secrets["urls"]["planilha_cabotagem"]
-       url = f"https://docs.google.com/spreadsheets/d/{file_id}/export?format=xlsx"
-       response = requests.get(url)
-       response.raise_for_status()
-       df = pd.read_excel(BytesIO(response.content))
-       
-       df['DATA DE EMBARQUE'] = pd.to_datetime(df['DATA DE EMBARQUE'], format='%Y-%m-%d', errors='coerce')
-       for col in ['QUANTIDADE C20', 'QUANTIDADE C40']:
-           df[col] = pd.to_numeric(df[col].str.replace(',', '.'), errors='coerce').fillna(0)
-       df['QUANTIDADE TOTAL'] = df['QUANTIDADE C20'] + df['QUANTIDADE C40']
-       
-       return df
-   except Exception as e:
-       st.error(f"Erro ao carregar dados de cabotagem: {e}")
-       return pd.DataFrame()
-
 def main():
    with st.sidebar:
        for nav in navigation:
@@ -286,6 +246,7 @@ def main():
 
    if st.session_state.get('clear_cache', False):
        st.cache_data.clear()
+       datasets.limpar_cache()
        st.session_state.clear_cache = False
 
    logo = carregar_logo()
@@ -306,9 +267,14 @@ def main():
 
        st.divider()
 
-   df_exp = carregar_dados_exportacao()
-   df_imp = carregar_dados_importacao()
-   df_cab = carregar_dados_cabotagem()
+   iniciar_atualizacao_periodica()
+   dados, erros, tempos = datasets.obter_datasets(['exportacao', 'importacao', 'cabotagem'])
+   for fonte, erro in erros.items():
+       st.error(f"Erro ao carregar dados de {datasets.DATASETS[fonte]['descricao']}: {erro}")
+
+   df_exp = dados.get('exportacao', pd.DataFrame())
+   df_imp = dados.get('importacao', pd.DataFrame())
+   df_cab = dados.get('cabotagem', pd.DataFrame())
 
    col1, col2, col3 = st.columns(3)
 
@@ -354,6 +320,28 @@ def main():
        if st.button("Visualizar Cabotagem", key="btn_cab", use_container_width=True):
            st.switch_page("pages/cabotagem.py")
 
+   st.caption(
+       "Tempo de carregamento: " +
+       " | ".join(f"{datasets.DATASETS[fonte]['descricao']}: {tempo:.1f}s" for fonte, tempo in sorted(tempos.items())) +
+       " — Dados atualizados: " +
+       " | ".join(
+           f"{datasets.DATASETS[fonte]['descricao']} {formatar_idade(datasets.idade_dataset(fonte))}"
+           for fonte in sorted(dados)
+       )
+   )
+   for fonte in sorted(dados):
+       falha = datasets.falha_atualizacao(fonte)
+       if falha:
+           st.warning(
+               f"Não foi possível atualizar {datasets.DATASETS[fonte]['descricao']} ({falha}). "
+               "Exibindo a última versão salva."
+           )
+   cache = estatisticas_cache()
+   st.caption(
+       f"Cache de filtros: {cache['taxa_acerto']:.0%} de acertos em {cache['acertos'] + cache['falhas']} consultas, "
+       f"{cache['bytes'] / 1024 ** 2:.1f} de {cache['limite_bytes'] / 1024 ** 2:.0f} MB"
+   )
+
    st.markdown("""
        <div class="features-container">
            <h3 style="color: #0365B0; margin-bottom: 1.5rem; text-align: center; font-size: 1.3rem; font-weight: 600; letter-spacing: 0.5px;">
@@ -0,0 +1,66 @@
+"""
+Compara limpar_numero aplicado célula a célula com a limpeza vetorizada de
+utils/numeros.py em colunas sintéticas.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.benchmark_numeros
+    python -m benchmarks.benchmark_numeros --linhas 200000
+"""
+import argparse
+import logging
+import time
+import numpy as np
+import pandas as pd
+from utils.data_processing import limpar_numero
+from utils.numeros import limpar_numeros
+
+
+def gerar_coluna(linhas, semente=42):
+    """Coluna no formato das planilhas: vírgula decimal, inteiros, floats, vazios e lixo."""
+    rng = np.random.default_rng(semente)
+    valores = rng.integers(0, 500, linhas)
+    tipo = rng.integers(0, 6, linhas)
+    coluna = np.empty(linhas, dtype=object)
+    coluna[tipo == 0] = [f"{v},5" for v in valores[tipo == 0]]
+    coluna[tipo == 1] = [str(v) for v in valores[tipo == 1]]
+    coluna[tipo == 2] = valores[tipo == 2].astype(float)
+    coluna[tipo == 3] = None
+    coluna[tipo == 4] = ''
+    coluna[tipo == 5] = [f"{v}.25" for v in valores[tipo == 5]]
+    # Alguns valores inválidos
+    invalidos = rng.choice(linhas, size=max(1, linhas // 10000), replace=False)
+    coluna[invalidos] = 'N/D'
+    return pd.Series(coluna, name='QTDE CONTAINER')
+
+
+def medir(funcao, serie):
+    inicio = time.perf_counter()
+    resultado = funcao(serie)
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da limpeza de números")
+    parser.add_argument('--linhas', type=int, default=1_000_000)
+    args = parser.parse_args()
+    # limpar_numero registra um erro por valor inválido
+    logging.disable(logging.ERROR)
+
+    mista = gerar_coluna(args.linhas)
+    # Como lida com dtype=str: todos os valores não nulos são texto
+    texto = mista.astype(str).where(mista.notna(), None)
+
+    print(f"linhas: {args.linhas:,}")
+    for descricao, serie in [('coluna mista', mista), ('coluna de texto', texto)]:
+        original, tempo_original = medir(lambda s: s.apply(limpar_numero), serie)
+        (vetorizado, relatorio), tempo_vetorizado = medir(limpar_numeros, serie)
+        diferencas = int((~np.isclose(original.astype(float), vetorizado)).sum())
+
+        print(f"\n{descricao}")
+        print(f"  apply(limpar_numero): {tempo_original:8.3f}s")
+        print(f"  limpar_numeros:       {tempo_vetorizado:8.3f}s  ({tempo_original / tempo_vetorizado:.1f}x)")
+        print(f"  valores diferentes:   {diferencas}")
+        print(f"  rejeitados:           {relatorio.rejeitados} (ex.: {relatorio.exemplos})")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""
+Compara os leitores de planilha de utils/parsers.py.
+
+Cada conjunto de dados é lido e limpo com cada leitor em um processo separado,
+medindo o tempo total e o pico de memória. O resultado limpo de cada leitor é
+comparado com o do openpyxl padrão. O pico de memória é o aumento do RSS
+durante a leitura (Linux) ou, em outros sistemas, o pico do tracemalloc.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.benchmark_parsers
+    python -m benchmarks.benchmark_parsers --importacao imp.xlsx --cabotagem cab.xlsx
+
+Sem planilhas informadas, as fixtures são geradas a partir dos registros
+vivos do consolidado incremental (utils.consolidacao.ler_consolidado). Para o
+leitor csv_pyarrow é usado o arquivo .csv de mesmo nome, se existir, ou um CSV
+gerado a partir do xlsx.
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+import tracemalloc
+import pandas as pd
+from utils import consolidacao
+from utils.ingestao import DATASETS, processar_conteudo
+from utils.parsers import PARSERS, PARSER_PADRAO, formato_parser
+
+
+def ler_registros(nome):
+    """
+    Registros vivos do consolidado do conjunto de dados. Se ainda não houver
+    consolidado (nenhuma ingestão), o Parquet legado de ARQUIVOS_CONSOLIDADOS
+    é importado em um consolidado temporário, sem criar o do projeto.
+    """
+    df = consolidacao.ler_consolidado(nome)
+    if df.empty:
+        with tempfile.TemporaryDirectory(prefix='consolidado-') as diretorio:
+            consolidacao.importar_legado_se_necessario(nome, diretorio, DATASETS[nome]['derivar'])
+            df = consolidacao.ler_consolidado(nome, diretorio)
+    if df.empty:
+        raise SystemExit(f"Sem dados consolidados de {nome}: informe a planilha com --{nome}.")
+    return df
+
+
+def gerar_fixture(nome, diretorio):
+    """Gera um xlsx de teste a partir dos registros consolidados do conjunto de dados."""
+    df = ler_registros(nome)
+    # Colunas de controle do consolidado e colunas derivadas não existem na planilha
+    df = df.drop(
+        columns=[*consolidacao.COLUNAS_CONTROLE, consolidacao.COLUNA_PARTICAO, *DATASETS[nome]['categoricas']],
+        errors='ignore'
+    )
+    if nome == 'cabotagem':
+        df['DATA DE EMBARQUE'] = df['DATA DE EMBARQUE'].dt.strftime('%Y-%m-%d')
+    caminho = os.path.join(diretorio, f"{nome}.xlsx")
+    df.to_excel(caminho, index=False)
+    return caminho
+
+
+def _caminho_csv(caminho_xlsx):
+    """CSV equivalente ao xlsx, gerado na primeira vez que for necessário."""
+    caminho_csv = os.path.splitext(caminho_xlsx)[0] + '.csv'
+    if not os.path.exists(caminho_csv):
+        pd.read_excel(caminho_xlsx).to_csv(caminho_csv, index=False)
+    return caminho_csv
+
+
+def _memoria_proc():
+    """(VmRSS, VmHWM) do processo em bytes, lidos de /proc no Linux."""
+    valores = {}
+    with open('/proc/self/status') as f:
+        for linha in f:
+            chave, _, valor = linha.partition(':')
+            if chave in ('VmRSS', 'VmHWM'):
+                valores[chave] = int(valor.split()[0]) * 1024
+    return valores['VmRSS'], valores['VmHWM']
+
+
+def _zerar_pico_rss():
+    """Zera o pico de RSS do processo (Linux); retorna False se não for suportado."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        _memoria_proc()
+        return True
+    except (OSError, KeyError):
+        return False
+
+
+def _medir(nome, parser, caminho, fila):
+    """Executado em um processo filho: lê, limpa e mede tempo e pico de memória."""
+    with open(caminho, 'rb') as f:
+        conteudo = f.read()
+
+    medir_rss = _zerar_pico_rss()
+    base_rss = _memoria_proc()[0] if medir_rss else 0
+
+    inicio = time.perf_counter()
+    erro, df = None, None
+    try:
+        df = processar_conteudo(nome, conteudo, parser)
+    except Exception as e:
+        erro = str(e)
+    duracao = time.perf_counter() - inicio
+
+    if medir_rss:
+        pico = _memoria_proc()[1] - base_rss
+    else:
+        # Sem /proc: segunda execução com tracemalloc, que mede só alocações do Python/NumPy
+        tracemalloc.start()
+        try:
+            processar_conteudo(nome, conteudo, parser)
+        except Exception:
+            pass
+        pico = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    fila.put({'duracao': duracao, 'pico': pico, 'erro': erro, 'df': df})
+
+
+def executar(nome, parser, caminho):
+    """Roda uma medição em um processo novo, para que o pico de memória seja só dela."""
+    contexto = multiprocessing.get_context('spawn')
+    fila = contexto.Queue()
+    processo = contexto.Process(target=_medir, args=(nome, parser, caminho, fila))
+    processo.start()
+    resultado = fila.get()
+    processo.join()
+    return resultado
+
+
+def _iguais(df, referencia):
+    try:
+        pd.testing.assert_frame_equal(
+            df.reset_index(drop=True), referencia.reset_index(drop=True),
+            check_dtype=False, check_column_type=False
+        )
+        return True
+    except AssertionError:
+        return False
+
+
+def main():
+    parser_args = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    for nome in DATASETS:
+        parser_args.add_argument(f"--{nome}", help=f"xlsx de {DATASETS[nome]['descricao']}")
+    parser_args.add_argument('--parsers', nargs='+', default=list(PARSERS), help="leitores a comparar")
+    args = parser_args.parse_args()
+
+    diretorio_fixtures = tempfile.mkdtemp(prefix='fixtures-')
+    fixtures = {
+        nome: getattr(args, nome) or gerar_fixture(nome, diretorio_fixtures)
+        for nome in DATASETS
+    }
+
+    print(f"{'dataset':<12} {'leitor':<18} {'tempo (s)':>9} {'pico memória (MB)':>18}  resultado")
+    for nome, caminho_xlsx in fixtures.items():
+        referencia = None
+        for parser in [PARSER_PADRAO] + [p for p in args.parsers if p != PARSER_PADRAO]:
+            caminho = _caminho_csv(caminho_xlsx) if formato_parser(parser) == 'csv' else caminho_xlsx
+            resultado = executar(nome, parser, caminho)
+            if resultado['erro']:
+                situacao = f"erro: {resultado['erro']}"
+            elif referencia is None:
+                referencia = resultado['df']
+                situacao = "referência"
+            else:
+                situacao = "idêntico" if _iguais(resultado['df'], referencia) else "DIFERENTE"
+            print(
+                f"{nome:<12} {parser:<18} {resultado['duracao']:9.2f} "
+                f"{resultado['pico'] / 1024 / 1024:18.1f}  {situacao}"
+            )
+
+
+if __name__ == '__main__':
+    main()
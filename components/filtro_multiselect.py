@@ -0,0 +1,25 @@
+import streamlit as st
+from utils.filtros import TODOS
+
+
+def create_multiselect(label, faceta, key):
+    """
+    Cria um multiselect para seleção de múltiplos filtros, com as opções
+    disponíveis sob os demais filtros e o total de contêineres de cada uma.
+
+    O widget é identificado apenas pela `key` (streamlit>=1.53), então as
+    seleções sobrevivem à mudança das opções e dos totais entre execuções.
+
+    Args:
+        label (str): rótulo do widget
+        faceta (pd.Series): total de contêineres por valor, na ordem de exibição
+        key (str): chave do widget no session_state
+    """
+    selecionados = [valor for valor in st.session_state.get(key, []) if valor != TODOS]
+    # Valores já selecionados continuam entre as opções, mesmo sem linhas sob os demais filtros
+    opcoes = list(faceta.index) + [valor for valor in selecionados if valor not in faceta.index]
+    totais = faceta.to_dict()
+    return st.multiselect(
+        label, [TODOS] + opcoes, default=[TODOS], key=key,
+        format_func=lambda valor: valor if valor == TODOS else f"{valor} ({totais.get(valor, 0):,})"
+    )
@@ -0,0 +1,46 @@
+import streamlit as st
+from utils.tabelas import pagina_de_posicoes, tabela_detalhes
+
+
+def display_paginated_table(df, posicoes, colunas, coluna_data, coluna_quantidade, key, linhas_por_pagina=50):
+    """
+    Exibe uma tabela de detalhes paginada no servidor.
+
+    Apenas as linhas da página visível são selecionadas, formatadas e enviadas
+    ao navegador; o total de linhas vem do tamanho de `posicoes`, sem montar o
+    resultado completo. A ordem das linhas é a de `posicoes` (a do índice de
+    filtros, por data), igual em todas as páginas. Sem linhas, a página volta
+    para 1 e apenas uma mensagem é exibida.
+
+    Args:
+        df (pd.DataFrame): dados completos do registro (não é modificado)
+        posicoes (np.ndarray): posições (iloc) das linhas filtradas
+        colunas (list): colunas exibidas
+        coluna_data (str): coluna formatada como data
+        coluna_quantidade (str): coluna formatada como quantidade
+        key (str): prefixo das chaves dos widgets
+        linhas_por_pagina (int): linhas em cada página
+    """
+    chave_pagina = f"{key}_pagina"
+    pedida = st.session_state.get(chave_pagina, 1)
+    visiveis, pagina, total_paginas = pagina_de_posicoes(posicoes, pedida, linhas_por_pagina)
+    # Quando os filtros reduzem o resultado, a página guardada pode não existir mais
+    if pedida != pagina:
+        st.session_state[chave_pagina] = pagina
+
+    if len(posicoes) == 0:
+        st.info("Nenhuma linha para exibir.")
+        return
+
+    tabela = tabela_detalhes(df.iloc[visiveis], colunas, coluna_data, coluna_quantidade)
+    st.dataframe(tabela, use_container_width=True, hide_index=True)
+
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        st.number_input("Página", min_value=1, max_value=total_paginas, step=1, key=chave_pagina)
+    with col2:
+        inicio = (pagina - 1) * linhas_por_pagina
+        st.caption(
+            f"Linhas {inicio + 1:,} a {inicio + len(visiveis):,} de {len(posicoes):,} "
+            f"(página {pagina} de {total_paginas})"
+        )
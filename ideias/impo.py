@@ -3,8 +3,8 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
-import hashlib
 import os
+from utils import consolidacao
 
 # Configuração da página
 st.set_page_config(
@@ -13,43 +13,11 @@ st.set_page_config(
     layout="wide"
 )
 
-def create_unique_id(row):
-    """Cria um ID único para cada registro baseado em campos chave"""
-    # Combinando campos relevantes para criar uma chave única
-    unique_string = f"{row['EMBARQUE']}_{row['CONSIGNATÁRIO']}_{row['ETA']}_{row['PORTO DESTINO']}_{row['CONTAINER PARCIAL']}_{row['VIAGEM']}"
-    # Criando um hash do string para ter um ID único
-    return hashlib.md5(unique_string.encode()).hexdigest()
-
 def remove_duplicates(df):
-    """Remove registros duplicados mantendo apenas a versão mais recente"""
-    # Criando ID único para cada registro
-    df['ID_UNICO'] = df.apply(create_unique_id, axis=1)
-    
-    # Adicionando data de atualização
-    df['DATA_ATUALIZACAO'] = datetime.now()
-    
-    # Se existe um arquivo de dados consolidados, carregar
-    if os.path.exists('dados_consolidados.parquet'):
-        df_consolidated = pd.read_parquet('dados_consolidados.parquet')
-        
-        # Combinando dados antigos com novos, mantendo apenas os mais recentes
-        df_all = pd.concat([df_consolidated, df])
-        df_all = df_all.sort_values('DATA_ATUALIZACAO').drop_duplicates(
-            subset=['ID_UNICO'], 
-            keep='last'
-        )
-    else:
-        df_all = df
-    
-    # Salvando dados consolidados
-    df_all.to_parquet('dados_consolidados.parquet')
-    
-    # Registrando log de atualização
-    with open('log_atualizacao.txt', 'a') as f:
-        f.write(f"{datetime.now()} - Registros processados: {len(df)}, "
-                f"Registros únicos após processamento: {len(df_all)}\n")
-    
-    return df_all
+    """Incorpora ao consolidado só os registros novos ou alterados e retorna a versão mais recente de cada um"""
+    consolidacao.importar_legado_se_necessario('importacao')
+    consolidacao.consolidar('importacao', df)
+    return consolidacao.ler_consolidado('importacao')
 
 def load_data():
     """Carrega e processa os dados do Excel"""
@@ -74,8 +42,9 @@ def load_data():
 
 def show_update_info():
     """Exibe informações sobre as atualizações dos dados"""
-    if os.path.exists('log_atualizacao.txt'):
-        with open('log_atualizacao.txt', 'r') as f:
+    caminho_log = consolidacao.caminho_log('importacao')
+    if os.path.exists(caminho_log):
+        with open(caminho_log, 'r') as f:
             last_updates = f.readlines()[-5:]  # Mostra as últimas 5 atualizações
         
         st.sidebar.markdown("### ⏱️ Últimas Atualizações")
@@ -1,9 +1,17 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-import requests
-from io import BytesIO
 from style import apply_styles
+from utils import datasets
+from utils.atualizacao import iniciar_atualizacao_periodica, formatar_idade
+from utils.data_processing import periodo_dados, total_conteineres
+from utils.filtros import BUSCA, TODOS, obter_indice
+from utils.busca import normalizar_texto
+from utils.entidades import coluna_entidade, com_entidades
+from utils.tabelas import manter_maiores, pivot_por_data
+from utils.cubo import fatiar, obter_cubo
+from components.tabela_paginada import display_paginated_table
+from components.filtro_multiselect import create_multiselect
 import logging
 
 # Configuração da página
@@ -37,70 +45,39 @@ for nav in navigation:
     ):
         st.switch_page(nav['page'])
 
-@st.cache_data(ttl=3600)
+# Chave do multiselect de cada coluna filtrável
+CHAVES_FILTRO = {
+    'ESTADO EXPORTADOR': 'estado',
+    'PORTO EMBARQUE': 'porto',
+    'ARMADOR': 'armador',
+    coluna_entidade('NOME EXPORTADOR'): 'exportador',
+    coluna_entidade('CONSIGNATÁRIO'): 'consignatario'
+}
+
+# Colunas da tabela pivot (abaixo do estado), por rótulo do seletor
+AGRUPAMENTOS_PIVOT = {
+    "Porto de Embarque": 'PORTO EMBARQUE',
+    "Exportador": coluna_entidade('NOME EXPORTADOR')
+}
+AGRUPAMENTO_PADRAO = "Porto de Embarque"
+# Entidades com coluna própria na pivot; as demais são somadas em OUTROS
+LIMITE_ENTIDADES_PIVOT = 20
+
 def load_and_process_data():
     """
-    Carrega e processa os dados da planilha de exportação.
+    Obtém os dados de exportação do registro de datasets.
     """
-    try:
-        with st.spinner('Carregando dados...'):
-            file_id = st.secrets["urls"]["planilha_exportacao"]
-            url = f"https://docs.google.com/spreadsheets/d/{file_id}/export?format=xlsx"
-            
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            excel_content = BytesIO(response.content)
-            
-            df = pd.read_excel(excel_content)
-            
-            if df.empty:
-                raise ValueError("A planilha está vazia.")
-                
-            df.columns = df.columns.str.strip().str.upper()
-            
-            required_columns = [
-                'DATA EMBARQUE', 'ESTADO EXPORTADOR', 'QTDE CONTEINER', 'PORTO EMBARQUE'
-            ]
-            
-            missing_cols = [col for col in required_columns if col not in df.columns]
-            if missing_cols:
-                raise ValueError(f"Colunas ausentes: {', '.join(missing_cols)}")
-            
-            df['DATA EMBARQUE'] = pd.to_datetime(df['DATA EMBARQUE'], errors='coerce')
-            df['QTDE CONTEINER'] = pd.to_numeric(
-                df['QTDE CONTEINER'].astype(str).str.replace(',', '.'), 
-                errors='coerce'
-            ).fillna(0)
-            
-            df = df.dropna(subset=['DATA EMBARQUE', 'ESTADO EXPORTADOR', 'PORTO EMBARQUE'])
-            
-            if df.empty:
-                raise ValueError("Dados inválidos após processamento.")
-            
-            df['DATA EMBARQUE SIMPLIFICADA'] = df['DATA EMBARQUE'].dt.date
-            
-            return df
-            
-    except Exception as e:
-        st.error(f"Erro ao carregar dados: {str(e)}")
-        return pd.DataFrame()
+    with st.spinner('Carregando dados...'):
+        dados, erros, _ = datasets.obter_datasets(['exportacao'])
+    if 'exportacao' in erros:
+        st.error(f"Erro ao carregar dados: {erros['exportacao']}")
+    return dados.get('exportacao', pd.DataFrame())
 
-def display_filtered_details(df, data_inicial, data_final, filtros):
+def display_filtered_details(df, posicoes):
     """
     Exibe os detalhes dos contêineres filtrados por data e outros critérios.
     """
-    detalhes = df.copy()
-    
-    detalhes = detalhes[
-        (detalhes['DATA EMBARQUE SIMPLIFICADA'] >= data_inicial) &
-        (detalhes['DATA EMBARQUE SIMPLIFICADA'] <= data_final)
-    ]
-    
-    for coluna, valores in filtros.items():
-        if valores and "Todos" not in valores and coluna in detalhes.columns:
-            detalhes = detalhes[detalhes[coluna].isin(valores)]
-
-    if detalhes.empty:
+    if len(posicoes) == 0:
         st.warning("Nenhum dado encontrado para os filtros selecionados.")
         return
 
@@ -112,63 +89,65 @@ def display_filtered_details(df, data_inicial, data_final, filtros):
         'PAÍS DE DESTINO', 'CIDADE EXPORTADOR', 'ESTADO EXPORTADOR',
         'ARMADOR', 'QTDE CONTEINER'
     ]
-    
-    colunas_existentes = [col for col in colunas if col in detalhes.columns]
-    detalhes_tabela = detalhes[colunas_existentes].copy()
-    
-    if 'DATA EMBARQUE' in detalhes_tabela.columns:
-        detalhes_tabela['DATA EMBARQUE'] = detalhes_tabela['DATA EMBARQUE'].dt.strftime('%d/%m/%Y')
-    
-    if 'QTDE CONTEINER' in detalhes_tabela.columns:
-        detalhes_tabela['QTDE CONTEINER'] = detalhes_tabela['QTDE CONTEINER'].apply(
-            lambda x: f"{int(x):,}" if x > 0 else "-"
-        )
-
-    st.dataframe(detalhes_tabela, use_container_width=True, hide_index=True)
+    display_paginated_table(df, posicoes, colunas, 'DATA EMBARQUE', 'QTDE CONTEINER', key="detalhes")
 
-def create_multiselect(label, df_column, key):
+def build_pivot_table(indice, data_inicial, data_final, filtros, agrupamento=AGRUPAMENTO_PADRAO):
     """
-    Cria um multiselect para seleção de múltiplos filtros.
+    Monta a tabela pivot por estado e pela coluna do agrupamento escolhido,
+    com as datas da mais recente para a mais antiga.
+
+    Por porto, a tabela vem do cubo pré-agregado quando os filtros permitem, ou
+    das linhas filtradas. Por exportador, das linhas filtradas com as
+    entidades canônicas, mantendo as LIMITE_ENTIDADES_PIVOT maiores.
     """
-    if df_column is None:
-        return ["Todos"]
-    options = df_column.dropna().unique().tolist()
-    return st.multiselect(label, ['Todos'] + sorted(map(str, options)), default=["Todos"], key=key)
+    coluna = AGRUPAMENTOS_PIVOT[agrupamento]
+    if coluna == 'PORTO EMBARQUE':
+        linhas_pivot = fatiar(obter_cubo('exportacao'), 'DATA EMBARQUE', data_inicial, data_final, filtros)
+        if linhas_pivot is None:
+            linhas_pivot = indice.filtrar(data_inicial, data_final, filtros)
+    else:
+        linhas_pivot = manter_maiores(
+            com_entidades(indice.filtrar(data_inicial, data_final, filtros), 'exportacao'),
+            coluna, 'QTDE CONTEINER', LIMITE_ENTIDADES_PIVOT
+        )
+    return pivot_por_data(
+        linhas_pivot, 'DATA EMBARQUE', ['ESTADO EXPORTADOR', coluna], 'QTDE CONTEINER',
+        cabecalho=("ESTADO EXPORTADOR", agrupamento.upper()), decrescente=True
+    )
 
 def main():
     st.markdown('<h1 class="main-title">📦 Previsão de Exportações de Containers</h1>', unsafe_allow_html=True)
-
-    if st.session_state.get("_is_running", False):
-        st.warning("Carregamento em andamento...")
-        st.stop()
-
-    st.session_state["_is_running"] = True
+    iniciar_atualizacao_periodica()
 
     try:
         df = load_and_process_data()
         if df.empty:
             st.error("Não foi possível carregar os dados.")
             st.stop()
+        indice = obter_indice('exportacao')
 
         # Métricas principais
-        total_containers = int(df['QTDE CONTEINER'].sum())
-        data_mais_antiga = df['DATA EMBARQUE'].min().strftime('%d/%m/%Y')
-        data_mais_recente = df['DATA EMBARQUE'].max().strftime('%d/%m/%Y')
-        range_datas = f"{data_mais_antiga} - {data_mais_recente}"
+        total_containers = total_conteineres(df, 'exportacao')
+        inicio_dados, fim_dados = periodo_dados(df, 'DATA EMBARQUE')
+        range_datas = f"{inicio_dados.strftime('%d/%m/%Y')} - {fim_dados.strftime('%d/%m/%Y')}"
 
         col1, col2 = st.columns(2)
         with col1:
             st.metric("TOTAL DE CONTAINERS", f"{total_containers:,}")
         with col2:
             st.metric("PERÍODO DOS DADOS", range_datas)
+        st.caption(f"Dados atualizados {formatar_idade(datasets.idade_dataset('exportacao'))}")
+        falha = datasets.falha_atualizacao('exportacao')
+        if falha:
+            st.warning(f"Não foi possível atualizar os dados ({falha}). Exibindo a última versão salva.")
 
         # Filtros principais
         st.markdown('<h3 class="subheader">Filtros</h3>', unsafe_allow_html=True)
 
         col1, col2 = st.columns(2)
         with col1:
-            data_mais_antiga_dt = df['DATA EMBARQUE'].min().date()
-            data_mais_recente_dt = df['DATA EMBARQUE'].max().date()
+            data_mais_antiga_dt = inicio_dados.date()
+            data_mais_recente_dt = fim_dados.date()
             data_inicial = st.date_input(
                 "Data Inicial",
                 min_value=data_mais_antiga_dt,
@@ -183,64 +162,61 @@ def main():
                 value=data_mais_recente_dt
             )
 
+        # Busca textual nos nomes, combinada aos demais filtros
+        termos_busca = normalizar_texto(st.text_input(
+            "Buscar", placeholder="Exportador, consignatário, cidade, navio...", key="busca"
+        ))
+        busca = [termos_busca] if termos_busca else []
+
+        # Opções de cada filtro sob as seleções atuais dos demais, com totais
+        facetas = indice.facetas(data_inicial, data_final, {
+            BUSCA: busca,
+            **{coluna: st.session_state.get(key, [TODOS]) for coluna, key in CHAVES_FILTRO.items()}
+        })
+
         # Filtros Primários
         col1, col2, col3 = st.columns(3)
         with col1:
-            estados_selecionados = create_multiselect("Estado Exportador", df['ESTADO EXPORTADOR'], "estado")
+            estados_selecionados = create_multiselect("Estado Exportador", facetas['ESTADO EXPORTADOR'], "estado")
         with col2:
-            portos_selecionados = create_multiselect("Porto de Embarque", df['PORTO EMBARQUE'], "porto")
+            portos_selecionados = create_multiselect("Porto de Embarque", facetas['PORTO EMBARQUE'], "porto")
         with col3:
-            armadores_selecionados = create_multiselect("Armador", df.get('ARMADOR'), "armador")
+            armadores_selecionados = create_multiselect("Armador", facetas['ARMADOR'], "armador")
+
+        # Filtros Secundários
+        with st.expander("Filtros Adicionais"):
+            col4, col5 = st.columns(2)
+            with col4:
+                exportadores = create_multiselect("Exportador", facetas[coluna_entidade('NOME EXPORTADOR')], "exportador")
+            with col5:
+                consignatarios = create_multiselect("Consignatário", facetas[coluna_entidade('CONSIGNATÁRIO')], "consignatario")
 
         # Aplicar filtros
         filtros = {
+            BUSCA: busca,
             'ESTADO EXPORTADOR': estados_selecionados,
             'PORTO EMBARQUE': portos_selecionados,
-            'ARMADOR': armadores_selecionados
+            'ARMADOR': armadores_selecionados,
+            coluna_entidade('NOME EXPORTADOR'): exportadores,
+            coluna_entidade('CONSIGNATÁRIO'): consignatarios
         }
 
-        df_filtrado = df.copy()
-        df_filtrado = df_filtrado[
-            (df_filtrado['DATA EMBARQUE SIMPLIFICADA'] >= data_inicial) &
-            (df_filtrado['DATA EMBARQUE SIMPLIFICADA'] <= data_final)
-        ]
-
-        for coluna, valores in filtros.items():
-            if valores and "Todos" not in valores and coluna in df_filtrado.columns:
-                df_filtrado = df_filtrado[df_filtrado[coluna].isin(valores)]
-
-        if not df_filtrado.empty:
-            # Tabela pivot
-            dados_pivot = df_filtrado.groupby(['DATA EMBARQUE', 'ESTADO EXPORTADOR', 'PORTO EMBARQUE'])['QTDE CONTEINER'].sum().reset_index()
-            tabela_pivot = dados_pivot.pivot_table(
-                index='DATA EMBARQUE',
-                columns=['ESTADO EXPORTADOR', 'PORTO EMBARQUE'],
-                values='QTDE CONTEINER',
-                aggfunc='sum'
-            ).fillna(0)
+        posicoes = indice.posicoes(data_inicial, data_final, filtros)
 
-            # Adicionar coluna "TOTAL"
-            tabela_pivot["TOTAL"] = tabela_pivot.sum(axis=1)
-
-            # Ajustar cabeçalhos para incluir "ESTADO EXPORTADOR", "PORTO DE EMBARQUE" e "TOTAL"
-            tabela_pivot.index.name = "DATA"
-            tabela_pivot = tabela_pivot.reset_index()
-            tabela_pivot.columns = pd.MultiIndex.from_tuples(
-                [("ESTADO EXPORTADOR", "PORTO DE EMBARQUE")] + 
-                [(col[0], col[1]) for col in tabela_pivot.columns[1:-1]] + 
-                [("TOTAL", "TOTAL")],  # Cabeçalho estático para TOTAL
-                names=["", ""]
+        if len(posicoes):
+            # Tabela pivot, guardada no cache de resultados por estado dos filtros
+            agrupamento = st.selectbox("Colunas da tabela por", list(AGRUPAMENTOS_PIVOT), key="agrupamento")
+            tabela_pivot = indice.memorizar(
+                f"pivot-{agrupamento}", data_inicial, data_final, filtros,
+                lambda: build_pivot_table(indice, data_inicial, data_final, filtros, agrupamento)
             )
 
-            # Organizar as datas da última para a primeira
-            tabela_pivot = tabela_pivot.sort_values(by=("ESTADO EXPORTADOR", "PORTO DE EMBARQUE"), ascending=False)
-
             # Renderizar tabela no Streamlit
-            st.markdown('<h3 class="subheader">Previsão de Embarques por Estado e Porto</h3>', unsafe_allow_html=True)
+            st.markdown(f'<h3 class="subheader">Previsão de Embarques por Estado e {agrupamento}</h3>', unsafe_allow_html=True)
             st.dataframe(tabela_pivot, use_container_width=True, hide_index=True)
 
             # Detalhes dos containers
-            display_filtered_details(df, data_inicial, data_final, filtros)
+            display_filtered_details(indice.df, posicoes)
         else:
             st.warning("Nenhum dado encontrado para os filtros selecionados.")
 
@@ -248,8 +224,6 @@ def main():
         st.error(f"Erro ao processar dados: {str(e)}")
         if st.button("Recarregar página"):
             st.rerun()
-    finally:
-        st.session_state["_is_running"] = False
 
 
 if __name__ == "__main__":
@@ -1,9 +1,17 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-import requests
-from io import BytesIO
 from style import apply_styles
+from utils import datasets
+from utils.atualizacao import iniciar_atualizacao_periodica, formatar_idade
+from utils.data_processing import periodo_dados, total_conteineres
+from utils.filtros import BUSCA, TODOS, obter_indice
+from utils.busca import normalizar_texto
+from utils.entidades import coluna_entidade, com_entidades
+from utils.tabelas import manter_maiores, pivot_por_data
+from utils.cubo import fatiar, obter_cubo
+from components.tabela_paginada import display_paginated_table
+from components.filtro_multiselect import create_multiselect
 
 # Configuração da página
 st.set_page_config(
@@ -32,116 +40,103 @@ for nav in navigation:
     ):
         st.switch_page(nav['page'])
 
-@st.cache_data(ttl=3600)
-def load_and_process_data():
-    try:
-        file_id = st.secrets["urls"]["planilha_importacao"]
-        url = f"https://docs.google.com/spreadsheets/d/{file_id}/export?format=xlsx"
-        
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        excel_content = BytesIO(response.content)
-        
-        df = pd.read_excel(excel_content)
-        
-        if df.empty:
-            raise ValueError("A planilha está vazia.")
-            
-        df.columns = df.columns.str.strip().str.upper()
-        
-        required_cols = ['ETA', 'UF CONSIGNATÁRIO', 'PORTO DESCARGA', 'QTDE CONTAINER']
-        missing_cols = [col for col in required_cols if col not in df.columns]
-        
-        if missing_cols:
-            raise ValueError(f"Colunas ausentes: {', '.join(missing_cols)}")
-        
-        df['ETA'] = pd.to_datetime(df['ETA'], errors='coerce')
-        df['QTDE CONTAINER'] = pd.to_numeric(df['QTDE CONTAINER'].astype(str).str.replace(',', '.'), errors='coerce').fillna(0)
-        
-        df = df.dropna(subset=['ETA', 'UF CONSIGNATÁRIO', 'PORTO DESCARGA'])
-        
-        if df.empty:
-            raise ValueError("Dados inválidos após processamento.")
-            
-        return df
-            
-    except Exception as e:
-        st.error(f"Erro ao carregar dados: {str(e)}")
-        return pd.DataFrame()
+# Chave do multiselect de cada coluna filtrável
+CHAVES_FILTRO = {
+    'UF CONSIGNATÁRIO': 'uf',
+    'PORTO DESCARGA': 'porto',
+    'ARMADOR': 'armador',
+    coluna_entidade('CONSIGNATARIO FINAL'): 'consig_final',
+    'CONSOLIDADOR': 'consolidador',
+    coluna_entidade('CONSIGNATÁRIO'): 'consignatario'
+}
+
+# Colunas da tabela pivot (abaixo da UF), por rótulo do seletor
+AGRUPAMENTOS_PIVOT = {
+    "Porto de Descarga": 'PORTO DESCARGA',
+    "Consignatário": coluna_entidade('CONSIGNATÁRIO')
+}
+AGRUPAMENTO_PADRAO = "Porto de Descarga"
+# Entidades com coluna própria na pivot; as demais são somadas em OUTROS
+LIMITE_ENTIDADES_PIVOT = 20
 
-def create_multiselect(label, df_column, key):
-    if df_column is None:
-        return ["Todos"]
-    options = df_column.dropna().unique().tolist()
-    return st.multiselect(label, ['Todos'] + sorted(map(str, options)), default=["Todos"], key=key)
-
-def display_filtered_details(df, data_inicial, data_final, filtros):
-    detalhes = df.copy()
-    
-    detalhes = detalhes[
-        (detalhes['ETA'].dt.date >= data_inicial) &
-        (detalhes['ETA'].dt.date <= data_final)
-    ]
-    
-    for coluna, valores in filtros.items():
-        if valores and "Todos" not in valores and coluna in detalhes.columns:
-            detalhes = detalhes[detalhes[coluna].isin(valores)]
+def load_and_process_data():
+    """Obtém os dados de importação do registro de datasets."""
+    dados, erros, _ = datasets.obter_datasets(['importacao'])
+    if 'importacao' in erros:
+        st.error(f"Erro ao carregar dados: {erros['importacao']}")
+    return dados.get('importacao', pd.DataFrame())
+
+def build_pivot_table(indice, data_inicial, data_final, filtros, agrupamento=AGRUPAMENTO_PADRAO):
+    """
+    Monta a tabela pivot por UF e pela coluna do agrupamento escolhido.
+
+    Por porto, a tabela vem do cubo pré-agregado quando os filtros permitem, ou
+    das linhas filtradas. Por consignatário, das linhas filtradas com as
+    entidades canônicas, mantendo as LIMITE_ENTIDADES_PIVOT maiores.
+    """
+    coluna = AGRUPAMENTOS_PIVOT[agrupamento]
+    if coluna == 'PORTO DESCARGA':
+        linhas_pivot = fatiar(obter_cubo('importacao'), 'ETA', data_inicial, data_final, filtros)
+        if linhas_pivot is None:
+            linhas_pivot = indice.filtrar(data_inicial, data_final, filtros)
+    else:
+        linhas_pivot = manter_maiores(
+            com_entidades(indice.filtrar(data_inicial, data_final, filtros), 'importacao'),
+            coluna, 'QTDE CONTAINER', LIMITE_ENTIDADES_PIVOT
+        )
+    return pivot_por_data(
+        linhas_pivot, 'ETA', ['UF CONSIGNATÁRIO', coluna], 'QTDE CONTAINER',
+        cabecalho=("UF CONSIGNATÁRIO", agrupamento.upper())
+    )
 
-    if detalhes.empty:
+def display_filtered_details(df, posicoes):
+    if len(posicoes) == 0:
         st.warning("Nenhum dado encontrado para os filtros selecionados.")
         return
 
     st.markdown('<h3 class="subheader">Detalhes dos Containers</h3>', unsafe_allow_html=True)
     
-    colunas = [col for col in [
+    colunas = [
         'ETA', 'CONSIGNATARIO FINAL', 'CONSOLIDADOR', 'CONSIGNATÁRIO',
         'TERMINAL DESCARGA', 'NOME EXPORTADOR', 'ARMADOR',
         'AGENTE INTERNACIONAL', 'NAVIO', 'PAÍS ORIGEM', 'PORTO ORIGEM',
         'UF CONSIGNATÁRIO', 'PORTO DESCARGA', 'QTDE CONTAINER'
-    ] if col in detalhes.columns]
-    
-    detalhes_tabela = detalhes[colunas].copy()
-    detalhes_tabela['ETA'] = detalhes_tabela['ETA'].dt.strftime('%d/%m/%Y')
-    detalhes_tabela['QTDE CONTAINER'] = detalhes_tabela['QTDE CONTAINER'].apply(
-        lambda x: f"{int(x):,}" if x > 0 else "-"
-    )
-
-    st.dataframe(detalhes_tabela, use_container_width=True, hide_index=True)
+    ]
+    display_paginated_table(df, posicoes, colunas, 'ETA', 'QTDE CONTAINER', key="detalhes")
 
 def main():
     st.markdown('<h1 class="main-title">📢 Previsão de Importações de Containers</h1>', unsafe_allow_html=True)
-
-    if st.session_state.get("_is_running", False):
-        st.warning("Carregamento em andamento...")
-        st.stop()
-
-    st.session_state["_is_running"] = True
+    iniciar_atualizacao_periodica()
 
     try:
         df = load_and_process_data()
         if df.empty:
             st.error("Não foi possível carregar os dados.")
             st.stop()
+        indice = obter_indice('importacao')
 
         # Métricas principais
-        total_containers = int(df['QTDE CONTAINER'].sum())
-        data_mais_antiga = df['ETA'].min().strftime('%d/%m/%Y')
-        data_mais_recente = df['ETA'].max().strftime('%d/%m/%Y')
-        range_datas = f"{data_mais_antiga} - {data_mais_recente}"
+        total_containers = total_conteineres(df, 'importacao')
+        inicio_dados, fim_dados = periodo_dados(df, 'ETA')
+        range_datas = f"{inicio_dados.strftime('%d/%m/%Y')} - {fim_dados.strftime('%d/%m/%Y')}"
 
         col1, col2 = st.columns(2)
         with col1:
             st.metric("TOTAL DE CONTAINERS", f"{total_containers:,}")
         with col2:
             st.metric("PERÍODO DOS DADOS", range_datas)
+        st.caption(f"Dados atualizados {formatar_idade(datasets.idade_dataset('importacao'))}")
+        falha = datasets.falha_atualizacao('importacao')
+        if falha:
+            st.warning(f"Não foi possível atualizar os dados ({falha}). Exibindo a última versão salva.")
 
         # Filtros principais
         st.markdown('<h3 class="subheader">Filtros</h3>', unsafe_allow_html=True)
 
         col1, col2 = st.columns(2)
         with col1:
-            data_mais_antiga_dt = df['ETA'].min().date()
-            data_mais_recente_dt = df['ETA'].max().date()
+            data_mais_antiga_dt = inicio_dados.date()
+            data_mais_recente_dt = fim_dados.date()
             data_inicial = st.date_input(
                 "Data Inicial",
                 min_value=data_mais_antiga_dt,
@@ -156,66 +151,56 @@ def main():
                 value=data_mais_recente_dt
             )
 
+        # Busca textual nos nomes, combinada aos demais filtros
+        termos_busca = normalizar_texto(st.text_input(
+            "Buscar", placeholder="Consignatário, exportador, agente, navio...", key="busca"
+        ))
+        busca = [termos_busca] if termos_busca else []
+
+        # Opções de cada filtro sob as seleções atuais dos demais, com totais
+        facetas = indice.facetas(data_inicial, data_final, {
+            BUSCA: busca,
+            **{coluna: st.session_state.get(key, [TODOS]) for coluna, key in CHAVES_FILTRO.items()}
+        })
+
         # Filtros Primários
         col1, col2, col3 = st.columns(3)
         with col1:
-            ufs_selecionadas = create_multiselect("UF Consignatário", df['UF CONSIGNATÁRIO'], "uf")
+            ufs_selecionadas = create_multiselect("UF Consignatário", facetas['UF CONSIGNATÁRIO'], "uf")
         with col2:
-            portos_selecionados = create_multiselect("Porto de Descarga", df['PORTO DESCARGA'], "porto")
+            portos_selecionados = create_multiselect("Porto de Descarga", facetas['PORTO DESCARGA'], "porto")
         with col3:
-            armadores_selecionados = create_multiselect("Armador", df['ARMADOR'], "armador")
+            armadores_selecionados = create_multiselect("Armador", facetas['ARMADOR'], "armador")
 
         # Filtros Secundários
         with st.expander("Filtros Adicionais"):
             col4, col5, col6 = st.columns(3)
             with col4:
-                consignatarios_finais = create_multiselect("Consignatário Final", df.get('CONSIGNATARIO FINAL'), "consig_final")
+                consignatarios_finais = create_multiselect("Consignatário Final", facetas[coluna_entidade('CONSIGNATARIO FINAL')], "consig_final")
             with col5:
-                consolidadores = create_multiselect("Consolidador", df.get('CONSOLIDADOR'), "consolidador")
+                consolidadores = create_multiselect("Consolidador", facetas['CONSOLIDADOR'], "consolidador")
             with col6:
-                consignatarios = create_multiselect("Consignatário", df.get('CONSIGNATÁRIO'), "consignatario")
+                consignatarios = create_multiselect("Consignatário", facetas[coluna_entidade('CONSIGNATÁRIO')], "consignatario")
 
         # Aplicar filtros
         filtros = {
+            BUSCA: busca,
             'UF CONSIGNATÁRIO': ufs_selecionadas,
             'PORTO DESCARGA': portos_selecionados,
             'ARMADOR': armadores_selecionados,
-            'CONSIGNATARIO FINAL': consignatarios_finais,
+            coluna_entidade('CONSIGNATARIO FINAL'): consignatarios_finais,
             'CONSOLIDADOR': consolidadores,
-            'CONSIGNATÁRIO': consignatarios
+            coluna_entidade('CONSIGNATÁRIO'): consignatarios
         }
 
-        df_filtrado = df.copy()
-        df_filtrado = df_filtrado[
-            (df_filtrado['ETA'].dt.date >= data_inicial) &
-            (df_filtrado['ETA'].dt.date <= data_final)
-        ]
-
-        for coluna, valores in filtros.items():
-            if valores and "Todos" not in valores and coluna in df_filtrado.columns:
-                df_filtrado = df_filtrado[df_filtrado[coluna].isin(valores)]
-
-        if not df_filtrado.empty:
-            # Tabela pivot
-            dados_pivot = df_filtrado.groupby(['ETA', 'UF CONSIGNATÁRIO', 'PORTO DESCARGA'])['QTDE CONTAINER'].sum().reset_index()
-            tabela_pivot = dados_pivot.pivot_table(
-                index='ETA',
-                columns=['UF CONSIGNATÁRIO', 'PORTO DESCARGA'],
-                values='QTDE CONTAINER',
-                aggfunc='sum'
-            ).fillna(0)
-
-            # Adicionar coluna "TOTAL"
-            tabela_pivot["TOTAL"] = tabela_pivot.sum(axis=1)
-
-            # Ajustar cabeçalhos para incluir "TOTAL"
-            tabela_pivot.index.name = "DATA"
-            tabela_pivot = tabela_pivot.reset_index()
-            tabela_pivot.columns = pd.MultiIndex.from_tuples(
-                [("UF CONSIGNATÁRIO", "PORTO DESCARGA")] + 
-                [(col[0], col[1]) for col in tabela_pivot.columns[1:-1]] + 
-                [("TOTAL", "TOTAL")],  # Cabeçalho estático para TOTAL
-                names=["", ""]
+        posicoes = indice.posicoes(data_inicial, data_final, filtros)
+
+        if len(posicoes):
+            # Tabela pivot, guardada no cache de resultados por estado dos filtros
+            agrupamento = st.selectbox("Colunas da tabela por", list(AGRUPAMENTOS_PIVOT), key="agrupamento")
+            tabela_pivot = indice.memorizar(
+                f"pivot-{agrupamento}", data_inicial, data_final, filtros,
+                lambda: build_pivot_table(indice, data_inicial, data_final, filtros, agrupamento)
             )
 
             # Renderizar tabela no Streamlit
@@ -223,7 +208,7 @@ def main():
             st.dataframe(tabela_pivot, use_container_width=True, hide_index=True)
 
             # Detalhes dos containers
-            display_filtered_details(df, data_inicial, data_final, filtros)
+            display_filtered_details(indice.df, posicoes)
         else:
             st.warning("Nenhum dado encontrado para os filtros selecionados.")
 
@@ -231,8 +216,6 @@ def main():
         st.error(f"Erro ao processar dados: {str(e)}")
         if st.button("Recarregar página"):
             st.rerun()
-    finally:
-        st.session_state["_is_running"] = False
 
 
 if __name__ == "__main__":
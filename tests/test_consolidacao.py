@@ -0,0 +1,114 @@
+import logging
+import pandas as pd
+import pytest
+from utils import consolidacao
+
+
+def _cabotagem(quantidades):
+    return pd.DataFrame({
+        'DATA DE EMBARQUE': pd.to_datetime(['2025-01-10', '2025-01-20', '2025-02-05']),
+        'PORTO DE ORIGEM': ['SANTOS', 'SANTOS', 'MANAUS'],
+        'PORTO DE DESTINO': ['MANAUS', 'SUAPE', 'SANTOS'],
+        'NAVIO': ['A', 'B', 'C'],
+        'VIAGEM': ['1', '2', '3'],
+        'REMETENTE': ['X', 'Y', 'Z'],
+        'DESTINATÁRIO': ['W', 'W', 'W'],
+        'QUANTIDADE TOTAL': quantidades
+    })
+
+
+def test_compactacao_interrompida_nao_duplica_linhas(tmp_path, monkeypatch):
+    diretorio = str(tmp_path)
+    consolidacao.consolidar('cabotagem', _cabotagem([1, 2, 3]), diretorio, compactar_automatico=False)
+    consolidacao.consolidar('cabotagem', _cabotagem([1, 5, 3]), diretorio, compactar_automatico=False)
+
+    # Compactação que para depois de gravar os arquivos compactados, sem remover os lotes
+    monkeypatch.setattr(consolidacao.os, 'remove', lambda caminho: None)
+    consolidacao.compactar('cabotagem', diretorio)
+    monkeypatch.undo()
+
+    df = consolidacao.ler_consolidado('cabotagem', diretorio)
+    assert len(df) == 3
+    assert df['QUANTIDADE TOTAL'].tolist() == [1, 5, 3]
+
+    # A compactação seguinte remove as cópias que ficaram para trás
+    consolidacao.compactar('cabotagem', diretorio)
+    assert all('compactado-' in caminho for _, _, caminho in consolidacao._fragmentos('cabotagem', diretorio))
+    assert consolidacao.ler_consolidado('cabotagem', diretorio)['QUANTIDADE TOTAL'].tolist() == [1, 5, 3]
+
+
+def _exportacao(portos_descarga, quantidades):
+    return pd.DataFrame({
+        'DATA EMBARQUE': pd.to_datetime(['2025-03-04'] * len(quantidades)),
+        'NAVIO': 'MSC ALFA',
+        'VIAGEM': '12N',
+        'NOME EXPORTADOR': 'EXPORTADORA X',
+        'CONSIGNATÁRIO': 'IMPORTER Y',
+        'PORTO EMBARQUE': 'SANTOS',
+        'PORTO DESCARGA': portos_descarga,
+        'PORTO DE DESTINO': 'ROTTERDAM',
+        'PAÍS DE DESTINO': 'HOLANDA',
+        'HS CODE': '0901',
+        'QTDE CONTEINER': quantidades,
+        'PESO BRUTO': 20_000.0
+    })
+
+
+def test_embarques_com_portos_de_descarga_diferentes_sao_mantidos(tmp_path):
+    diretorio = str(tmp_path)
+    resultado = consolidacao.consolidar('exportacao', _exportacao(['ROTTERDAM', 'ANTUERPIA'], [2, 3]), diretorio)
+    assert resultado.total == 2
+    assert consolidacao.ler_consolidado('exportacao', diretorio)['QTDE CONTEINER'].sum() == 5
+
+
+def test_correcao_de_quantidade_altera_o_mesmo_registro(tmp_path):
+    diretorio = str(tmp_path)
+    consolidacao.consolidar('exportacao', _exportacao(['ROTTERDAM'], [2]), diretorio)
+    resultado = consolidacao.consolidar('exportacao', _exportacao(['ROTTERDAM'], [4]), diretorio)
+    assert (resultado.novos, resultado.alterados, resultado.total) == (0, 1, 1)
+    assert consolidacao.ler_consolidado('exportacao', diretorio)['QTDE CONTEINER'].tolist() == [4]
+
+
+def test_ids_sao_recalculados_quando_a_chave_muda(tmp_path, monkeypatch):
+    diretorio = str(tmp_path)
+    chave_antiga = [coluna for coluna in consolidacao.CHAVES_ID['exportacao'] if coluna != 'PORTO DESCARGA']
+    chave_antiga += ['QTDE CONTEINER']
+    monkeypatch.setitem(consolidacao.CHAVES_ID, 'exportacao', chave_antiga)
+    consolidacao.consolidar('exportacao', _exportacao(['ROTTERDAM'], [2]), diretorio)
+    monkeypatch.undo()
+
+    resultado = consolidacao.consolidar('exportacao', _exportacao(['ROTTERDAM'], [4]), diretorio)
+    assert (resultado.novos, resultado.alterados, resultado.total) == (0, 1, 1)
+    assert consolidacao.ler_consolidado('exportacao', diretorio)['QTDE CONTEINER'].tolist() == [4]
+
+
+def test_linhas_identicas_repetidas_sao_descartadas_com_aviso(tmp_path, caplog):
+    df = _cabotagem([1, 2, 3])
+    with caplog.at_level(logging.WARNING):
+        resultado = consolidacao.consolidar('cabotagem', pd.concat([df, df.iloc[[0]]]), str(tmp_path))
+    assert resultado.total == 3
+    assert '1 linhas com ID repetido descartadas' in caplog.text
+
+
+def test_ids_repetidos_com_conteudo_diferente_falham(tmp_path):
+    df = _cabotagem([1, 2, 3])
+    corrigida = df.iloc[[0]].assign(**{'QUANTIDADE TOTAL': 9})
+    with pytest.raises(ValueError, match='conteúdo diferente'):
+        consolidacao.consolidar('cabotagem', pd.concat([df, corrigida]), str(tmp_path))
+
+
+def test_leitura_refeita_se_fragmento_sumir(tmp_path, monkeypatch):
+    diretorio = str(tmp_path)
+    consolidacao.consolidar('cabotagem', _cabotagem([1, 2, 3]), diretorio)
+    ler_tabela = consolidacao.pq.read_table
+    falhas = []
+
+    def ler_tabela_removida_uma_vez(caminho, **kwargs):
+        if not falhas:
+            falhas.append(caminho)
+            raise FileNotFoundError(caminho)
+        return ler_tabela(caminho, **kwargs)
+
+    monkeypatch.setattr(consolidacao.pq, 'read_table', ler_tabela_removida_uma_vez)
+    assert consolidacao.ler_consolidado('cabotagem', diretorio)['QUANTIDADE TOTAL'].tolist() == [1, 2, 3]
+    assert falhas
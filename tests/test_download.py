@@ -0,0 +1,83 @@
+"""
+baixar_com_cache contra um servidor HTTP local que responde 304 quando o
+If-None-Match confere com o ETag atual.
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import pytest
+from utils.download import baixar_com_cache, ler_metadados
+
+
+class Planilha:
+    """Conteúdo e ETag servidos, e os cabeçalhos condicionais recebidos."""
+
+    def __init__(self):
+        self.conteudo = b'versao 1'
+        self.etag = '"1"'
+        self.condicionais = []
+
+
+@pytest.fixture
+def servidor(monkeypatch):
+    monkeypatch.setenv('NO_PROXY', '127.0.0.1')
+    planilha = Planilha()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            planilha.condicionais.append(self.headers.get('If-None-Match'))
+            if self.headers.get('If-None-Match') == planilha.etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('ETag', planilha.etag)
+            self.send_header('Content-Length', str(len(planilha.conteudo)))
+            self.end_headers()
+            self.wfile.write(planilha.conteudo)
+
+        def log_message(self, *args):
+            pass
+
+    http = HTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=http.serve_forever, daemon=True).start()
+    yield planilha, f"http://127.0.0.1:{http.server_port}/planilha.xlsx"
+    http.shutdown()
+    http.server_close()
+
+
+def test_revalidacao_condicional(servidor, tmp_path):
+    planilha, url = servidor
+    cache = str(tmp_path)
+
+    primeiro = baixar_com_cache('teste', url, diretorio=cache)
+    assert primeiro.conteudo == b'versao 1' and primeiro.alterado
+    assert planilha.condicionais == [None]
+
+    # Mesmo ETag: 304, conteúdo lido do cache
+    verificado = ler_metadados('teste', cache)['verificado_em']
+    segundo = baixar_com_cache('teste', url, diretorio=cache)
+    assert planilha.condicionais[-1] == '"1"'
+    assert segundo == (b'versao 1', primeiro.hash, False)
+    assert ler_metadados('teste', cache)['verificado_em'] >= verificado
+
+    # ETag e conteúdo novos
+    planilha.conteudo, planilha.etag = b'versao 2', '"2"'
+    terceiro = baixar_com_cache('teste', url, diretorio=cache)
+    assert terceiro.conteudo == b'versao 2' and terceiro.alterado
+    assert terceiro.hash != primeiro.hash
+
+    # ETag novo com o mesmo conteúdo: 200, mas o hash mostra que nada mudou
+    planilha.etag = '"3"'
+    quarto = baixar_com_cache('teste', url, diretorio=cache)
+    assert planilha.condicionais[-1] == '"2"'
+    assert quarto == (b'versao 2', terceiro.hash, False)
+    assert ler_metadados('teste', cache)['etag'] == '"3"'
+
+
+def test_url_diferente_nao_usa_o_cache(servidor, tmp_path):
+    planilha, url = servidor
+    cache = str(tmp_path)
+    baixar_com_cache('teste', url, diretorio=cache)
+    outra = baixar_com_cache('teste', url + '?outra', diretorio=cache)
+    assert planilha.condicionais == [None, None]
+    assert outra.alterado
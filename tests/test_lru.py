@@ -0,0 +1,17 @@
+import numpy as np
+import pandas as pd
+from utils.lru import CacheLRU, tamanho_em_bytes
+
+
+def test_tamanho_de_dicionario_soma_os_valores():
+    facetas = {'ARMADOR': pd.Series(np.arange(10_000), index=[f"A{i}" for i in range(10_000)])}
+    assert tamanho_em_bytes(facetas) >= tamanho_em_bytes(facetas['ARMADOR']) > 10_000 * 8
+
+
+def test_limite_vale_para_dicionarios():
+    cache = CacheLRU(limite_bytes=200_000)
+    for i in range(10):
+        cache.obter(i, lambda: {'coluna': np.zeros(10_000)})
+    estatisticas = cache.estatisticas()
+    assert estatisticas['bytes'] <= 200_000
+    assert estatisticas['entradas'] == 2
@@ -0,0 +1,17 @@
+import pandas as pd
+from utils.numeros import limpar_numeros
+
+
+def test_formatos_brasileiro_e_americano():
+    serie = pd.Series(['1.234,56', '1,234.56', '1.234.567', '1,5', '2.5', '-1,234,567.8', '', None])
+    numeros, relatorio = limpar_numeros(serie)
+    assert numeros.tolist() == [1234.56, 1234.56, 1234567.0, 1.5, 2.5, -1234567.8, 0.0, 0.0]
+    assert relatorio.rejeitados == 0
+
+
+def test_separadores_misturados_sao_rejeitados():
+    serie = pd.Series(['1,2.5', '12.34,5.6', '1.234,56', 'abc'])
+    numeros, relatorio = limpar_numeros(serie)
+    assert numeros.tolist() == [0.0, 0.0, 1234.56, 0.0]
+    assert relatorio.rejeitados == 3
+    assert relatorio.exemplos == ['1,2.5', '12.34,5.6', 'abc']
@@ -0,0 +1,168 @@
+"""
+Teste de fumaça das páginas: cada uma é executada pelo AppTest do Streamlit
+e não pode terminar com exceção nem com mensagem de erro.
+
+O consolidado, o cache de downloads e os snapshots ficam em uma pasta
+temporária, com alguns registros de cada conjunto de dados gerados aqui; a
+ingestão da planilha é substituída, sem acessar a rede.
+"""
+import glob
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import requests
+from streamlit.testing.v1 import AppTest
+from utils import consolidacao, datasets, download, ingestao, snapshots
+from utils.atualizacao import parar_atualizacao_periodica
+from utils.ingestao import DATASETS
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGINAS = sorted(glob.glob(os.path.join(RAIZ, 'pages', '*.py')))
+LINHAS = 60
+
+# Colunas de texto usadas pelas páginas, com os valores sorteados em cada uma
+TEXTOS = {
+    'importacao': {
+        'EMBARQUE': [f"BL{i:04d}" for i in range(LINHAS)],
+        'CONSIGNATÁRIO': ['ALFA COMERCIO LTDA', 'Alfa Comércio Ltda.', 'BETA IMPORTADORA SA', 'GAMA FOODS'],
+        'CONSIGNATARIO FINAL': ['ALFA COMERCIO LTDA', 'DELTA VAREJO', 'GAMA FOODS'],
+        'CONSOLIDADOR': ['CONSOLIDA X', 'CONSOLIDA Y'],
+        'NOME EXPORTADOR': ['SHANGHAI TRADING', 'HAMBURG EXPORT'],
+        'AGENTE INTERNACIONAL': ['AGENTE 1', 'AGENTE 2'],
+        'NAVIO': ['MSC ALFA', 'MAERSK BETA'],
+        'VIAGEM': ['001N', '002S'],
+        'ARMADOR': ['MSC', 'MAERSK', 'CMA CGM'],
+        'TERMINAL DESCARGA': ['TECON', 'BTP'],
+        'PAÍS ORIGEM': ['CHINA', 'ALEMANHA'],
+        'PORTO ORIGEM': ['SHANGHAI', 'HAMBURGO'],
+        'UF CONSIGNATÁRIO': ['SP', 'SC', 'PR'],
+        'PORTO DESCARGA': ['SANTOS', 'ITAPOA', 'PARANAGUA'],
+        'PORTO DESTINO': ['SANTOS', 'ITAPOA'],
+        'CONTAINER PARCIAL': ['N', 'S']
+    },
+    'exportacao': {
+        'NAVIO': ['MSC ALFA', 'MAERSK BETA'],
+        'VIAGEM': [f"{i:03d}N" for i in range(LINHAS)],
+        'NOME EXPORTADOR': ['CAFE BRASIL SA', 'Café Brasil S/A', 'CARNES SUL LTDA'],
+        'CONSIGNATÁRIO': ['ROTTERDAM FOODS', 'NY IMPORTS'],
+        'PORTO DE ORIGEM': ['SANTOS', 'ITAJAI'],
+        'PORTO EMBARQUE': ['SANTOS', 'ITAJAI', 'PARANAGUA'],
+        'TERMINAL EMBARQUE': ['TECON', 'BTP'],
+        'PORTO DESCARGA': ['ROTTERDAM', 'NEW YORK'],
+        'PORTO DE DESTINO': ['ROTTERDAM', 'NEW YORK'],
+        'PAÍS DE DESTINO': ['HOLANDA', 'ESTADOS UNIDOS'],
+        'HS CODE': ['0901', '0202'],
+        'CIDADE EXPORTADOR': ['SAO PAULO', 'CHAPECO'],
+        'ESTADO EXPORTADOR': ['SP', 'SC', 'PR'],
+        'ARMADOR': ['MSC', 'MAERSK']
+    },
+    'cabotagem': {
+        'PORTO DE ORIGEM': ['SANTOS', 'MANAUS', 'SUAPE'],
+        'PORTO DE DESTINO': ['MANAUS', 'SALVADOR', 'SANTOS'],
+        'NAVIO': ['LOG IN JACARANDA', 'MERCOSUL SANTOS'],
+        'VIAGEM': [f"{i:03d}" for i in range(LINHAS)],
+        'REMETENTE': ['ALFA INDUSTRIA', 'BETA LOGISTICA', 'GAMA ALIMENTOS'],
+        'DESTINATÁRIO': ['DELTA VAREJO', 'EPSILON ATACADO'],
+        'REMETENTE - CIDADE': ['SAO PAULO - SP', 'MANAUS - AM', 'RECIFE - PE'],
+        'DESTINATÁRIO - CIDADE': ['MANAUS', 'SALVADOR', 'SANTOS'],
+        'DESTINATÁRIO - ESTADO': ['AM', 'BA', 'SP'],
+        'ARMADOR': ['LOG-IN', 'MERCOSUL LINE']
+    }
+}
+
+
+def dados_de_teste(nome):
+    """Registros limpos de um conjunto de dados, com datas em três semanas e dois meses."""
+    posicoes = np.arange(LINHAS)
+    df = pd.DataFrame({
+        coluna: [valores[(i * (numero + 1)) % len(valores)] for i in posicoes]
+        for numero, (coluna, valores) in enumerate(TEXTOS[nome].items())
+    })
+    df[DATASETS[nome]['coluna_data']] = pd.Timestamp('2025-01-20') + pd.to_timedelta(posicoes % 21, unit='D')
+    if nome == 'cabotagem':
+        df['QUANTIDADE C20'] = (posicoes % 3).astype(float)
+        df['QUANTIDADE C40'] = (posicoes % 2 + 1).astype(float)
+    else:
+        df['QTDE CONTAINER' if nome == 'importacao' else 'QTDE CONTEINER'] = (posicoes % 4 + 1).astype(float)
+        df['PESO BRUTO'] = posicoes * 1000.0
+    derivar = DATASETS[nome]['derivar']
+    return derivar(df) if derivar else df
+
+
+@pytest.fixture
+def diretorios_temporarios(tmp_path, monkeypatch):
+    monkeypatch.setattr(consolidacao, 'DIRETORIO_CONSOLIDADO', str(tmp_path / 'consolidado'))
+    monkeypatch.setattr(download, 'DIRETORIO_CACHE', str(tmp_path / 'downloads'))
+    monkeypatch.setattr(snapshots, 'DIRETORIO_SNAPSHOTS', str(tmp_path / 'snapshots'))
+    monkeypatch.setattr(ingestao, 'DIRETORIO_LOCKS', str(tmp_path / 'locks'))
+    datasets.limpar_cache()
+    yield
+    # A página inicia a thread de ingestão periódica do processo
+    parar_atualizacao_periodica()
+    datasets.limpar_cache()
+
+
+@pytest.fixture
+def consolidado_de_teste(diretorios_temporarios, monkeypatch):
+    for nome in DATASETS:
+        consolidacao.consolidar(nome, dados_de_teste(nome))
+    # A planilha não mudou: a ingestão não faz nada
+    monkeypatch.setattr(datasets, 'ingerir_dataset', lambda nome, timeout=None: None)
+
+
+@pytest.mark.parametrize('pagina', PAGINAS, ids=os.path.basename)
+def test_pagina_renderiza_sem_erros(consolidado_de_teste, pagina):
+
+    at = AppTest.from_file(pagina, default_timeout=300).run()
+    assert not at.exception, [excecao.value for excecao in at.exception]
+    assert not at.error, [erro.value for erro in at.error]
+    assert not at.warning, [aviso.value for aviso in at.warning]
+    assert at.dataframe
+
+
+def test_primeira_execucao_sem_rede_usa_o_consolidado(diretorios_temporarios, monkeypatch):
+    def ingerir_sem_rede(nome, timeout=None):
+        # Os arquivos antigos do projeto são importados antes do download, que falha
+        consolidacao.consolidar(nome, dados_de_teste(nome))
+        raise requests.ConnectionError("sem rede")
+
+    monkeypatch.setattr(datasets, 'ingerir_dataset', ingerir_sem_rede)
+
+    at = AppTest.from_file(os.path.join(RAIZ, 'pages', 'cabotagem.py'), default_timeout=300).run()
+    assert not at.exception, [excecao.value for excecao in at.exception]
+    assert not at.error, [erro.value for erro in at.error]
+    assert any('sem rede' in aviso.value for aviso in at.warning)
+    assert at.dataframe
+
+
+# Grafias de um mesmo nome nos dados de teste
+VARIANTES = {
+    'importacao.py': {'ALFA COMERCIO LTDA', 'Alfa Comércio Ltda.'},
+    'exportacao.py': {'CAFE BRASIL SA', 'Café Brasil S/A'}
+}
+
+
+@pytest.mark.parametrize('pagina, agrupamento', [('importacao.py', 'Consignatário'), ('exportacao.py', 'Exportador')])
+def test_pivot_por_entidade(consolidado_de_teste, pagina, agrupamento):
+    at = AppTest.from_file(os.path.join(RAIZ, 'pages', pagina), default_timeout=300).run()
+    at.selectbox(key='agrupamento').set_value(agrupamento).run()
+    assert not at.exception, [excecao.value for excecao in at.exception]
+    assert not at.error, [erro.value for erro in at.error]
+    colunas = {nome for _, nome in at.dataframe[0].value.columns}
+    # As duas grafias do mesmo nome aparecem em uma única coluna
+    variantes = VARIANTES[pagina]
+    assert len(variantes & colunas) == 1
+
+
+@pytest.mark.parametrize('pagina', ['importacao.py', 'exportacao.py'])
+def test_selecao_sobrevive_a_mudanca_das_opcoes(consolidado_de_teste, pagina):
+    at = AppTest.from_file(os.path.join(RAIZ, 'pages', pagina), default_timeout=300).run()
+    # As opções vêm formatadas com o total: 'VALOR (N)'
+    porto = at.multiselect(key='porto').options[1].rsplit(' (', 1)[0]
+    at.multiselect(key='porto').set_value([porto]).run()
+    # Filtrar por armador muda as opções e os totais do filtro de porto
+    armador = at.multiselect(key='armador').options[1].rsplit(' (', 1)[0]
+    at.multiselect(key='armador').set_value([armador]).run()
+    assert not at.exception, [excecao.value for excecao in at.exception]
+    assert at.multiselect(key='porto').value == [porto]
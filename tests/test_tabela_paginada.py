@@ -0,0 +1,33 @@
+from streamlit.testing.v1 import AppTest
+
+
+def _tabela(quantidade):
+    # Executada isolada pelo AppTest: as importações ficam dentro da função
+    import numpy as np
+    import pandas as pd
+    from components.tabela_paginada import display_paginated_table
+
+    df = pd.DataFrame({
+        'DATA': pd.date_range('2025-01-01', periods=200, freq='D'),
+        'QTDE': np.arange(200)
+    })
+    display_paginated_table(df, np.arange(quantidade), ['DATA', 'QTDE'], 'DATA', 'QTDE', key="detalhes")
+
+
+def test_pagina_e_limitada_quando_o_resultado_diminui():
+    at = AppTest.from_function(_tabela, args=(60,))
+    at.session_state['detalhes_pagina'] = 4
+    at.run()
+    assert not at.exception
+    assert at.number_input(key='detalhes_pagina').value == 2
+    assert at.caption[0].value == "Linhas 51 a 60 de 60 (página 2 de 2)"
+
+
+def test_resultado_vazio_exibe_mensagem():
+    at = AppTest.from_function(_tabela, args=(0,))
+    at.session_state['detalhes_pagina'] = 3
+    at.run()
+    assert not at.exception
+    assert at.session_state['detalhes_pagina'] == 1
+    assert not at.caption
+    assert at.info[0].value == "Nenhuma linha para exibir."
@@ -0,0 +1,79 @@
+"""
+Ingestão periódica das planilhas em segundo plano.
+
+Uma única thread por processo ingere cada planilha no consolidado (pelo
+registro, utils.datasets) ao iniciar e depois a cada intervalo configurado. As
+páginas continuam lendo a versão consolidada em memória enquanto a nova é
+gravada; a troca é feita de uma só vez pelo registro.
+"""
+import logging
+import threading
+from utils import datasets
+
+_atualizador = None
+_lock = threading.Lock()
+
+
+class AtualizadorDatasets(threading.Thread):
+    """Thread que atualiza os conjuntos de dados a cada `intervalo` segundos."""
+
+    def __init__(self, nomes, intervalo):
+        super().__init__(name="atualizador-datasets", daemon=True)
+        self.nomes = list(nomes)
+        self.intervalo = intervalo
+        self._parar = threading.Event()
+
+    def run(self):
+        while not self._parar.is_set():
+            for nome in self.nomes:
+                if self._parar.is_set():
+                    return
+                try:
+                    datasets.atualizar_dataset(nome)
+                except Exception as e:
+                    logging.error(f"Erro ao atualizar {nome}: {e}")
+            self._parar.wait(self.intervalo)
+
+    def parar(self):
+        self._parar.set()
+
+
+def iniciar_atualizacao_periodica(intervalo=datasets.TTL_PADRAO, nomes=None):
+    """
+    Inicia a thread de ingestão, se ainda não estiver rodando neste processo.
+
+    Args:
+        intervalo (int): segundos entre as atualizações
+        nomes (list): conjuntos de dados a atualizar; todos por padrão
+
+    Returns:
+        AtualizadorDatasets: a thread em execução
+    """
+    global _atualizador
+    with _lock:
+        if _atualizador is None or not _atualizador.is_alive():
+            _atualizador = AtualizadorDatasets(nomes or list(datasets.DATASETS), intervalo)
+            _atualizador.start()
+        return _atualizador
+
+
+def parar_atualizacao_periodica():
+    """Interrompe a thread de atualização, se houver."""
+    global _atualizador
+    with _lock:
+        if _atualizador is not None:
+            _atualizador.parar()
+            _atualizador = None
+
+
+def formatar_idade(segundos):
+    """Texto curto com a idade dos dados, como 'há 5 min'."""
+    if segundos is None:
+        return "-"
+    if segundos < 60:
+        return "agora há pouco"
+    if segundos < 3600:
+        return f"há {int(segundos // 60)} min"
+    if segundos < 86400:
+        return f"há {int(segundos // 3600)} h"
+    return f"há {int(segundos // 86400)} dias"
@@ -0,0 +1,148 @@
+"""
+Busca textual nas colunas de nomes (exportador, consignatário, remetente, navio etc.).
+
+IndiceBusca é montado uma vez por versão do conjunto de dados
+(datasets.obter_derivado) e responde às buscas sem percorrer as linhas:
+
+- cada texto distinto das colunas buscáveis é normalizado (maiúsculas, sem
+  acentos nem pontuação) e recebe um código; cada linha guarda, por coluna, o
+  código do seu texto;
+- o índice invertido liga cada palavra aos textos que a contêm;
+- o índice de n-gramas (1 a 3 caracteres) liga cada trecho às palavras e aos
+  textos que o contêm, para que "maers" encontre "MAERSK".
+
+Uma busca é dividida em termos; cada termo precisa aparecer como parte de
+alguma palavra de alguma das colunas da linha. O resultado é uma máscara
+booleana, combinada aos demais filtros.
+"""
+import re
+import unicodedata
+from collections import defaultdict
+import numpy as np
+import pandas as pd
+from utils import datasets
+
+# Colunas buscáveis de cada conjunto de dados
+COLUNAS_BUSCA = {
+    'importacao': [
+        'CONSIGNATARIO FINAL', 'CONSIGNATÁRIO', 'CONSOLIDADOR', 'NOME EXPORTADOR',
+        'AGENTE INTERNACIONAL', 'NAVIO', 'ARMADOR'
+    ],
+    'exportacao': [
+        'NOME EXPORTADOR', 'CONSIGNATÁRIO', 'CIDADE EXPORTADOR', 'NAVIO', 'ARMADOR',
+        'PORTO DE DESTINO'
+    ],
+    'cabotagem': ['REMETENTE', 'DESTINATÁRIO', 'REMETENTE - CIDADE', 'DESTINATÁRIO - CIDADE', 'NAVIO', 'ARMADOR']
+}
+
+# Maior n-grama indexado; trechos maiores são buscados pela interseção dos seus n-gramas
+TAMANHO_NGRAMA = 3
+
+
+def normalizar_texto(texto):
+    """Maiúsculas, sem acentos e com pontuação trocada por espaços ('Açúcar S/A' -> 'ACUCAR S A')."""
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(caractere for caractere in texto if not unicodedata.combining(caractere))
+    return re.sub(r'[^A-Z0-9]+', ' ', texto.upper()).strip()
+
+
+def _ngramas(palavra):
+    return {
+        palavra[inicio:inicio + tamanho]
+        for tamanho in range(1, TAMANHO_NGRAMA + 1)
+        for inicio in range(len(palavra) - tamanho + 1)
+    }
+
+
+class IndiceBusca:
+    """Índice invertido de palavras e n-gramas das colunas buscáveis."""
+
+    def __init__(self, df, colunas):
+        self.colunas = [coluna for coluna in colunas if coluna in df.columns]
+        self.tamanho = len(df)
+        textos = {}
+        # Código do texto de cada linha, por coluna (-1 para vazio)
+        self.codigos = []
+        for coluna in self.colunas:
+            codigos, valores = pd.factorize(df[coluna])
+            ids = np.array(
+                [textos.setdefault(normalizar_texto(valor), len(textos)) for valor in valores], dtype=np.int32
+            )
+            codigos_texto = np.full(len(codigos), -1, dtype=np.int32)
+            preenchidos = codigos >= 0
+            codigos_texto[preenchidos] = ids[codigos[preenchidos]]
+            self.codigos.append(codigos_texto)
+        self.total_textos = len(textos)
+
+        palavras = {}
+        textos_por_palavra = defaultdict(list)
+        for texto, id_texto in textos.items():
+            for palavra in set(texto.split()):
+                textos_por_palavra[palavras.setdefault(palavra, len(palavras))].append(id_texto)
+        self.palavras = list(palavras)
+        self.textos_por_palavra = [
+            np.array(textos_por_palavra[id_palavra], dtype=np.int32) for id_palavra in range(len(palavras))
+        ]
+
+        palavras_por_ngrama = defaultdict(list)
+        for palavra, id_palavra in palavras.items():
+            for ngrama in _ngramas(palavra):
+                palavras_por_ngrama[ngrama].append(id_palavra)
+        self.palavras_por_ngrama = {
+            ngrama: np.array(ids, dtype=np.int32) for ngrama, ids in palavras_por_ngrama.items()
+        }
+        # Termos curtos são respondidos direto pelos textos de cada n-grama
+        self.textos_por_ngrama = {
+            ngrama: np.unique(np.concatenate([self.textos_por_palavra[id_palavra] for id_palavra in ids]))
+            for ngrama, ids in self.palavras_por_ngrama.items()
+        }
+
+    def _palavras_com(self, termo):
+        """Códigos das palavras que contêm o termo (mais longo que TAMANHO_NGRAMA)."""
+        listas = []
+        for inicio in range(len(termo) - TAMANHO_NGRAMA + 1):
+            lista = self.palavras_por_ngrama.get(termo[inicio:inicio + TAMANHO_NGRAMA])
+            if lista is None:
+                return np.array([], dtype=np.int32)
+            listas.append(lista)
+        candidatas = listas[0]
+        for lista in sorted(listas[1:], key=len):
+            candidatas = np.intersect1d(candidatas, lista, assume_unique=True)
+        # A interseção dos n-gramas não garante a ordem deles; confere o trecho inteiro
+        return np.array([id_palavra for id_palavra in candidatas if termo in self.palavras[id_palavra]], dtype=np.int32)
+
+    def textos_com(self, termo):
+        """Tabela booleana por código de texto (com uma posição extra para vazio) dos textos que contêm o termo."""
+        tabela = np.zeros(self.total_textos + 1, dtype=bool)
+        if len(termo) <= TAMANHO_NGRAMA:
+            if termo in self.textos_por_ngrama:
+                tabela[self.textos_por_ngrama[termo]] = True
+            return tabela
+        for id_palavra in self._palavras_com(termo):
+            tabela[self.textos_por_palavra[id_palavra]] = True
+        return tabela
+
+    def mascara(self, consulta, linhas=slice(None)):
+        """
+        Máscara booleana, sobre `linhas`, das linhas que contêm todos os termos da consulta.
+
+        Returns:
+            np.ndarray ou None se a consulta não tiver termos
+        """
+        termos = normalizar_texto(consulta).split()
+        if not termos:
+            return None
+        mascara = None
+        for termo in termos:
+            tabela = self.textos_com(termo)
+            # Vazios têm código -1, que aponta para a última posição (sempre False)
+            termo_mascara = np.zeros(self.tamanho, dtype=bool)[linhas]
+            for codigos in self.codigos:
+                termo_mascara |= tabela[codigos[linhas]]
+            mascara = termo_mascara if mascara is None else mascara & termo_mascara
+        return mascara
+
+
+def obter_indice_busca(nome):
+    """Índice de busca da versão atual do conjunto de dados, calculado uma vez e compartilhado."""
+    return datasets.obter_derivado(nome, 'indice_busca', lambda df: IndiceBusca(df, COLUNAS_BUSCA[nome]))
@@ -0,0 +1,477 @@
+"""
+Consolidação incremental do histórico de cada conjunto de dados.
+
+Em vez de ler o Parquet consolidado inteiro, concatenar a planilha nova,
+deduplicar e regravar tudo a cada execução, o consolidado é mantido como:
+
+    consolidado/<nome>/indice.parquet                     ID_UNICO, HASH_LINHA e LOTE de cada registro vivo
+    consolidado/<nome>/chave_id.json                      colunas chave com que os IDs foram gerados
+    consolidado/<nome>/dados/ANO_MES=AAAA-MM/*.parquet    linhas gravadas em cada lote, por mês
+
+A cada consolidação, só as linhas novas ou alteradas (hash do conteúdo diferente
+do registrado no índice) são gravadas em novos fragmentos, e o índice passa a
+apontar para o lote mais recente de cada ID. O custo é proporcional ao tamanho
+da alteração, não ao histórico. Quando há lotes demais, compactar() regrava
+só as linhas vivas em um arquivo por mês.
+
+Os dados ficam particionados no formato Hive pelo ano-mês da coluna de data
+de cada conjunto e ordenados por data dentro de cada arquivo. ler_consolidado()
+com data_inicial/data_final lê apenas os meses do período, e o filtro de data
+é aplicado na leitura do Parquet, descartando os row groups fora do intervalo
+pelas estatísticas de mínimo e máximo.
+
+Se as colunas chave de CHAVES_ID mudarem, a consolidação seguinte recalcula
+os IDs dos registros vivos e os regrava em um novo lote (_rechavear_se_necessario).
+
+Na primeira consolidação, os dados_*_consolidados.parquet antigos do projeto
+são importados (importar_legado_se_necessario) para não perder o histórico.
+"""
+import glob
+import json
+import logging
+import os
+import re
+import tempfile
+from collections import namedtuple
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from utils.ids import ARQUIVOS_CONSOLIDADOS, CHAVES_ID, gerar_hash_linhas, gerar_ids, ids_no_formato_atual
+from utils.singleflight import TravaArquivo
+from utils.snapshots import preparar_para_parquet
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIRETORIO_CONSOLIDADO = os.path.join(RAIZ, 'consolidado')
+LIMITE_FRAGMENTOS = 20
+LINHAS_POR_GRUPO = 50_000
+
+# Coluna de data usada para particionar e ordenar cada conjunto de dados
+COLUNA_DATA = {
+    'importacao': 'ETA',
+    'exportacao': 'DATA EMBARQUE',
+    'cabotagem': 'DATA DE EMBARQUE'
+}
+COLUNA_PARTICAO = 'ANO_MES'
+PARTICAO_SEM_DATA = '__HIVE_DEFAULT_PARTITION__'
+TIMEOUT_TRAVA = 300
+TENTATIVAS_LEITURA = 3
+# Linhas repetidas mostradas no log de cada lote
+QUANTIDADE_EXEMPLOS = 3
+
+# Colunas de controle, que não fazem parte do conteúdo do registro
+COLUNAS_CONTROLE = ('ID_UNICO', 'DATA_ATUALIZACAO', 'LOTE')
+
+ResultadoConsolidacao = namedtuple('ResultadoConsolidacao', ['processados', 'novos', 'alterados', 'total'])
+
+_REGEX_FRAGMENTO = re.compile(r'^(?:lote|compactado)-(\d+)\.parquet$')
+
+
+def _diretorio(nome, diretorio):
+    return os.path.join(diretorio, nome)
+
+
+def _caminho_indice(nome, diretorio):
+    return os.path.join(_diretorio(nome, diretorio), 'indice.parquet')
+
+
+def _diretorio_dados(nome, diretorio):
+    return os.path.join(_diretorio(nome, diretorio), 'dados')
+
+
+def _diretorio_particao(nome, diretorio, particao):
+    return os.path.join(_diretorio_dados(nome, diretorio), f"{COLUNA_PARTICAO}={particao}")
+
+
+def _gravar_parquet(df, caminho, linhas_por_grupo=None):
+    """Grava o Parquet de forma atômica (arquivo temporário + os.replace)."""
+    pasta = os.path.dirname(caminho)
+    os.makedirs(pasta, exist_ok=True)
+    fd, temporario = tempfile.mkstemp(dir=pasta, prefix='.tmp-', suffix='.parquet')
+    os.close(fd)
+    try:
+        preparar_para_parquet(df).to_parquet(
+            temporario, index=False, engine='pyarrow', row_group_size=linhas_por_grupo
+        )
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+
+def _caminho_chave(nome, diretorio):
+    return os.path.join(_diretorio(nome, diretorio), 'chave_id.json')
+
+
+def _indice_vazio():
+    return pd.DataFrame({
+        'ID_UNICO': np.array([], dtype=np.uint64),
+        'HASH_LINHA': np.array([], dtype=np.uint64),
+        'LOTE': np.array([], dtype=np.int64)
+    })
+
+
+def ler_indice(nome, diretorio=None):
+    """Retorna o índice de IDs do consolidado (vazio se ainda não existir)."""
+    diretorio = diretorio or DIRETORIO_CONSOLIDADO
+    caminho = _caminho_indice(nome, diretorio)
+    if not os.path.exists(caminho):
+        return _indice_vazio()
+    return pd.read_parquet(caminho, engine='pyarrow')
+
+
+def versao_consolidado(nome, diretorio=None):
+    """
+    Identificador da versão atual do consolidado (muda a cada lote gravado),
+    ou None se ele ainda não existir. Custa apenas um stat do índice.
+    """
+    diretorio = diretorio or DIRETORIO_CONSOLIDADO
+    try:
+        return os.stat(_caminho_indice(nome, diretorio)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _particoes(serie_datas):
+    """Valor da partição (AAAA-MM) de cada linha; datas ausentes vão para a partição padrão."""
+    datas = pd.to_datetime(serie_datas, errors='coerce')
+    return datas.dt.strftime('%Y-%m').fillna(PARTICAO_SEM_DATA)
+
+
+def _fragmentos(nome, diretorio):
+    """Lista (lote, partição, caminho) dos fragmentos gravados, em ordem de lote."""
+    fragmentos = []
+    padrao = os.path.join(_diretorio_dados(nome, diretorio), f"{COLUNA_PARTICAO}=*", '*.parquet')
+    for caminho in glob.glob(padrao):
+        encontrado = _REGEX_FRAGMENTO.match(os.path.basename(caminho))
+        if encontrado:
+            particao = os.path.basename(os.path.dirname(caminho)).split('=', 1)[1]
+            fragmentos.append((int(encontrado.group(1)), particao, caminho))
+    return sorted(fragmentos)
+
+
+def _fragmentos_vigentes(fragmentos):
+    """
+    Descarta os fragmentos já incorporados a um arquivo compactado da mesma
+    partição (lote menor ou igual ao dele).
+
+    A compactação grava os arquivos compactados antes de remover os antigos;
+    até a remoção (ou para sempre, se o processo parar no meio), as mesmas
+    linhas vivas estão nos dois. Lendo só os vigentes, elas não se repetem.
+    """
+    def compactado(caminho):
+        return os.path.basename(caminho).startswith('compactado-')
+
+    ultimo_compactado = {}
+    for lote, particao, caminho in fragmentos:
+        if compactado(caminho):
+            ultimo_compactado[particao] = max(lote, ultimo_compactado.get(particao, lote))
+    return [
+        (lote, particao, caminho) for lote, particao, caminho in fragmentos
+        if lote > ultimo_compactado.get(particao, 0)
+        or (lote == ultimo_compactado[particao] and compactado(caminho))
+    ]
+
+
+def _gravar_particionado(nome, diretorio, df, prefixo, lote):
+    """Grava `df` em um arquivo por partição de ano-mês, ordenado por data."""
+    coluna_data = COLUNA_DATA[nome]
+    particoes = _particoes(df[coluna_data])
+    for particao, grupo in df.groupby(particoes.to_numpy(), sort=False):
+        grupo = grupo.sort_values([coluna_data, 'ID_UNICO'], kind='stable')
+        caminho = os.path.join(_diretorio_particao(nome, diretorio, particao), f"{prefixo}-{lote:06d}.parquet")
+        _gravar_parquet(grupo, caminho, LINHAS_POR_GRUPO)
+
+
+def _preparar_lote(nome, df):
+    """
+    Garante IDs uint64, remove IDs repetidos dentro do lote e calcula o hash das linhas.
+
+    Linhas repetidas só são descartadas se forem idênticas a outra com o mesmo
+    ID; a quantidade e alguns exemplos vão para o log.
+
+    Raises:
+        ValueError: se linhas com o mesmo ID diferirem fora das colunas chave
+    """
+    df = df.drop(columns=['DATA_ATUALIZACAO', 'LOTE'], errors='ignore')
+    if not ids_no_formato_atual(df):
+        df = df.assign(ID_UNICO=gerar_ids(df, CHAVES_ID[nome]))
+    hashes = gerar_hash_linhas(df, ignorar=COLUNAS_CONTROLE)
+
+    repetidas = df['ID_UNICO'].duplicated(keep='last').to_numpy()
+    if repetidas.any():
+        exemplos = df.loc[repetidas, CHAVES_ID[nome]].head(QUANTIDADE_EXEMPLOS).to_dict('records')
+        logging.warning(f"{nome}: {int(repetidas.sum())} linhas com ID repetido descartadas; exemplos: {exemplos}")
+        versoes = pd.DataFrame({'ID_UNICO': df['ID_UNICO'].to_numpy(), 'HASH_LINHA': hashes})
+        conflitos = versoes.groupby('ID_UNICO')['HASH_LINHA'].nunique()
+        conflitos = conflitos[conflitos > 1]
+        if len(conflitos):
+            raise ValueError(
+                f"{nome}: {len(conflitos)} IDs repetidos com conteúdo diferente fora das colunas chave "
+                f"{CHAVES_ID[nome]}"
+            )
+        df = df[~repetidas].reset_index(drop=True)
+        hashes = hashes[~repetidas]
+    return df, hashes
+
+
+def _rechavear_se_necessario(nome, diretorio):
+    """
+    Recalcula os IDs dos registros vivos se o consolidado foi gravado com outras
+    colunas chave, regravando-os em um novo lote compactado.
+
+    Chamado com o lock do consolidado já adquirido.
+    """
+    caminho = _caminho_chave(nome, diretorio)
+    try:
+        with open(caminho, encoding='utf-8') as f:
+            if json.load(f) == CHAVES_ID[nome]:
+                return
+    except (OSError, ValueError):
+        pass
+
+    if len(ler_indice(nome, diretorio)):
+        df = ler_consolidado(nome, diretorio)
+        df, hashes = _preparar_lote(nome, df.assign(ID_UNICO=gerar_ids(df, CHAVES_ID[nome])))
+        fragmentos = _fragmentos(nome, diretorio)
+        lote = fragmentos[-1][0] + 1
+        _gravar_particionado(nome, diretorio, df.assign(DATA_ATUALIZACAO=datetime.now(), LOTE=lote), 'compactado', lote)
+        _gravar_parquet(pd.DataFrame({
+            'ID_UNICO': df['ID_UNICO'].to_numpy(),
+            'HASH_LINHA': hashes,
+            'LOTE': np.full(len(df), lote, dtype=np.int64)
+        }), _caminho_indice(nome, diretorio))
+        logging.info(f"{nome}: IDs de {len(df)} registros recalculados com as novas colunas chave")
+
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(CHAVES_ID[nome], f, ensure_ascii=False)
+
+
+def caminho_log(nome, diretorio=None):
+    """Arquivo com o histórico das consolidações do conjunto de dados."""
+    diretorio = diretorio or DIRETORIO_CONSOLIDADO
+    return os.path.join(_diretorio(nome, diretorio), f"log_atualizacao_{nome}.txt")
+
+
+def _registrar_log(nome, diretorio, processados, total):
+    with open(caminho_log(nome, diretorio), 'a') as f:
+        f.write(f"{datetime.now()} - Registros processados: {processados}, "
+                f"Registros únicos após processamento: {total}\n")
+
+
+def consolidar(nome, df, diretorio=None, compactar_automatico=True):
+    """
+    Incorpora ao consolidado apenas as linhas novas ou alteradas de `df`.
+
+    Args:
+        nome (str): conjunto de dados ('importacao', 'exportacao' ou 'cabotagem')
+        df (pd.DataFrame): dados limpos da planilha
+        diretorio (str): raiz do consolidado (DIRETORIO_CONSOLIDADO se omitido)
+        compactar_automatico (bool): compacta quando houver mais de LIMITE_FRAGMENTOS fragmentos
+
+    Returns:
+        ResultadoConsolidacao: linhas processadas, novas, alteradas e total de registros
+    """
+    diretorio = diretorio or DIRETORIO_CONSOLIDADO
+    faltando = [coluna for coluna in CHAVES_ID[nome] if coluna not in df.columns]
+    if faltando:
+        raise ValueError(f"As seguintes colunas estão ausentes: {faltando}")
+
+    os.makedirs(_diretorio(nome, diretorio), exist_ok=True)
+    with TravaArquivo(os.path.join(_diretorio(nome, diretorio), '.lock'), timeout=TIMEOUT_TRAVA):
+        _rechavear_se_necessario(nome, diretorio)
+        lote_df, hashes = _preparar_lote(nome, df)
+        indice = ler_indice(nome, diretorio)
+
+        posicoes = pd.Index(indice['ID_UNICO']).get_indexer(lote_df['ID_UNICO'])
+        novos = posicoes == -1
+        alterados = np.zeros(len(lote_df), dtype=bool)
+        existentes = np.flatnonzero(~novos)
+        alterados[existentes] = indice['HASH_LINHA'].to_numpy()[posicoes[existentes]] != hashes[existentes]
+        gravar = novos | alterados
+
+        if gravar.any():
+            fragmentos = _fragmentos(nome, diretorio)
+            lote = (fragmentos[-1][0] + 1) if fragmentos else 1
+            delta = lote_df[gravar].assign(DATA_ATUALIZACAO=datetime.now(), LOTE=lote)
+            _gravar_particionado(nome, diretorio, delta, 'lote', lote)
+
+            # Atualiza o índice: linhas alteradas apontam para o novo lote, novas são acrescentadas
+            indice = indice.copy()
+            indice.loc[posicoes[alterados], 'HASH_LINHA'] = hashes[alterados]
+            indice.loc[posicoes[alterados], 'LOTE'] = lote
+            indice = pd.concat([indice, pd.DataFrame({
+                'ID_UNICO': lote_df['ID_UNICO'].to_numpy()[novos],
+                'HASH_LINHA': hashes[novos],
+                'LOTE': np.full(int(novos.sum()), lote, dtype=np.int64)
+            })], ignore_index=True)
+            _gravar_parquet(indice, _caminho_indice(nome, diretorio))
+
+        _registrar_log(nome, diretorio, len(df), len(indice))
+        resultado = ResultadoConsolidacao(len(df), int(novos.sum()), int(alterados.sum()), len(indice))
+
+        if compactar_automatico and _quantidade_lotes(nome, diretorio) > LIMITE_FRAGMENTOS:
+            _compactar(nome, diretorio)
+
+    logging.info(
+        f"{nome}: {resultado.processados} linhas processadas, {resultado.novos} novas, "
+        f"{resultado.alterados} alteradas, {resultado.total} registros no consolidado"
+    )
+    return resultado
+
+
+def _quantidade_lotes(nome, diretorio):
+    return len({lote for lote, _, _ in _fragmentos(nome, diretorio)})
+
+
+def _filtros_data(coluna_data, data_inicial, data_final):
+    filtros = []
+    if data_inicial is not None:
+        filtros.append((coluna_data, '>=', pd.Timestamp(data_inicial)))
+    if data_final is not None:
+        # data_final inclui o dia inteiro
+        filtros.append((coluna_data, '<', pd.Timestamp(data_final).normalize() + pd.Timedelta(days=1)))
+    return filtros or None
+
+
+def _particao_no_periodo(particao, data_inicial, data_final):
+    if particao == PARTICAO_SEM_DATA:
+        return data_inicial is None and data_final is None
+    if data_inicial is not None and particao < pd.Timestamp(data_inicial).strftime('%Y-%m'):
+        return False
+    if data_final is not None and particao > pd.Timestamp(data_final).strftime('%Y-%m'):
+        return False
+    return True
+
+
+def _ler_vivas(nome, diretorio, colunas, data_inicial, data_final):
+    coluna_data = COLUNA_DATA[nome]
+    # O índice é lido antes da lista de fragmentos: um lote gravado no meio da
+    # leitura não tem linhas apontadas por ele
+    indice = ler_indice(nome, diretorio)
+    fragmentos = [
+        (lote, particao, caminho) for lote, particao, caminho in _fragmentos_vigentes(_fragmentos(nome, diretorio))
+        if _particao_no_periodo(particao, data_inicial, data_final)
+    ]
+    if not fragmentos:
+        return pd.DataFrame()
+
+    if colunas is None:
+        # Colunas que a limpeza deixou de gerar continuam nos fragmentos antigos;
+        # vale o esquema do lote mais recente
+        colunas = pq.read_schema(max(fragmentos)[2]).names
+    colunas = list(dict.fromkeys(list(colunas) + [coluna_data, 'ID_UNICO', 'LOTE']))
+    filtros = _filtros_data(coluna_data, data_inicial, data_final)
+    tabelas = []
+    for _, _, caminho in sorted(fragmentos, key=lambda fragmento: (fragmento[1], fragmento[0])):
+        existentes = set(pq.read_schema(caminho).names)
+        tabelas.append(pq.read_table(
+            caminho, columns=[coluna for coluna in colunas if coluna in existentes], filters=filtros
+        ).to_pandas())
+    df = pd.concat(tabelas, ignore_index=True)
+
+    # Uma linha é viva se o índice aponta para o lote em que ela foi gravada
+    vivas = pd.MultiIndex.from_arrays([df['ID_UNICO'], df['LOTE']]).isin(
+        pd.MultiIndex.from_arrays([indice['ID_UNICO'], indice['LOTE']])
+    )
+    df = df[vivas]
+    if len(fragmentos) > 1:
+        df = df.sort_values(coluna_data, kind='stable')
+    return df.reset_index(drop=True)
+
+
+def ler_consolidado(nome, diretorio=None, colunas=None, data_inicial=None, data_final=None):
+    """
+    Lê os registros vivos do consolidado (a versão mais recente de cada ID).
+
+    A leitura não usa o lock do consolidado. Se um fragmento listado for
+    removido por uma compactação no meio da leitura, ou se o índice mudar
+    durante ela, a leitura é refeita (até TENTATIVAS_LEITURA vezes).
+
+    Args:
+        nome (str): conjunto de dados
+        diretorio (str): raiz do consolidado (DIRETORIO_CONSOLIDADO se omitido)
+        colunas (list): colunas a ler (None para todas)
+        data_inicial, data_final: período da coluna de data; só as partições e
+            row groups do período são lidos
+
+    Returns:
+        pd.DataFrame: registros consolidados ordenados por data (vazio se não houver consolidado)
+    """
+    diretorio = diretorio or DIRETORIO_CONSOLIDADO
+    for tentativa in range(1, TENTATIVAS_LEITURA + 1):
+        versao = versao_consolidado(nome, diretorio)
+        try:
+            df = _ler_vivas(nome, diretorio, colunas, data_inicial, data_final)
+        except FileNotFoundError:
+            if tentativa == TENTATIVAS_LEITURA:
+                raise
+            logging.info(f"{nome}: fragmento removido durante a leitura; lendo de novo")
+            continue
+        if versao_consolidado(nome, diretorio) == versao:
+            break
+        logging.info(f"{nome}: consolidado alterado durante a leitura; lendo de novo")
+    return df
+
+
+def _compactar(nome, diretorio):
+    fragmentos = _fragmentos(nome, diretorio)
+    if _quantidade_lotes(nome, diretorio) <= 1:
+        return
+    df = ler_consolidado(nome, diretorio)
+    ultimo_lote = fragmentos[-1][0]
+    _gravar_particionado(nome, diretorio, df, 'compactado', ultimo_lote)
+    novos = {
+        os.path.join(_diretorio_particao(nome, diretorio, particao), f"compactado-{ultimo_lote:06d}.parquet")
+        for particao in _particoes(df[COLUNA_DATA[nome]]).unique()
+    }
+    for _, _, caminho in fragmentos:
+        if caminho in novos:
+            continue
+        try:
+            os.remove(caminho)
+        except OSError as e:
+            logging.error(f"Erro ao remover fragmento {caminho}: {e}")
+
+
+def compactar(nome, diretorio=None):
+    """
+    Regrava as linhas vivas de todos os fragmentos em um arquivo por mês,
+    descartando as versões substituídas. O LOTE de cada linha é preservado.
+    """
+    diretorio = diretorio or DIRETORIO_CONSOLIDADO
+    with TravaArquivo(os.path.join(_diretorio(nome, diretorio), '.lock'), timeout=TIMEOUT_TRAVA):
+        _compactar(nome, diretorio)
+
+
+def importar_legado(nome, caminho, diretorio=None, preparar=None):
+    """
+    Carrega um dados_*_consolidados.parquet monolítico no consolidado incremental.
+    IDs no formato antigo (md5) são recalculados.
+
+    Args:
+        preparar (callable): função aplicada ao DataFrame antigo antes de
+            consolidar, para recalcular colunas derivadas que ele não tenha
+    """
+    diretorio = diretorio or DIRETORIO_CONSOLIDADO
+    df = pd.read_parquet(caminho, engine='pyarrow')
+    if preparar is not None:
+        df = preparar(df)
+    if not ids_no_formato_atual(df):
+        df['ID_UNICO'] = gerar_ids(df, CHAVES_ID[nome])
+    return consolidar(nome, df, diretorio)
+
+
+def importar_legado_se_necessario(nome, diretorio=None, preparar=None):
+    """
+    Na primeira consolidação, importa o Parquet monolítico antigo do projeto
+    (ARQUIVOS_CONSOLIDADOS), se ele existir, para não perder o histórico.
+    """
+    diretorio = diretorio or DIRETORIO_CONSOLIDADO
+    if os.path.exists(_caminho_indice(nome, diretorio)):
+        return None
+    caminho = os.path.join(RAIZ, ARQUIVOS_CONSOLIDADOS[nome])
+    if not os.path.exists(caminho):
+        return None
+    return importar_legado(nome, caminho, diretorio, preparar)
+
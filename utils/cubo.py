@@ -0,0 +1,66 @@
+"""
+Cubo pré-agregado das tabelas dinâmicas de importação e exportação.
+
+O cubo soma a quantidade de contêineres por data × UF × porto × armador e é
+calculado uma única vez por versão dos dados (datasets.obter_derivado). A
+tabela dinâmica das páginas é montada a partir do recorte do cubo pelos
+filtros, em vez de agrupar as linhas brutas a cada interação; o custo passa a
+depender do número de combinações, não do número de registros.
+
+Filtros em colunas que não são dimensões do cubo (ex.: consignatário) não
+podem ser respondidos por ele; nesse caso fatiar() retorna None e a página usa
+as linhas filtradas.
+"""
+from utils import datasets
+from utils.filtros import filtrar, filtro_ativo
+
+# Dimensões e medida do cubo de cada conjunto de dados
+CUBOS = {
+    'importacao': {
+        'coluna_data': 'ETA',
+        'dimensoes': ['UF CONSIGNATÁRIO', 'PORTO DESCARGA', 'ARMADOR'],
+        'coluna_valor': 'QTDE CONTAINER'
+    },
+    'exportacao': {
+        'coluna_data': 'DATA EMBARQUE',
+        'dimensoes': ['ESTADO EXPORTADOR', 'PORTO EMBARQUE', 'ARMADOR'],
+        'coluna_valor': 'QTDE CONTEINER'
+    }
+}
+
+
+def construir_cubo(df, coluna_data, dimensoes, coluna_valor):
+    """
+    Soma `coluna_valor` por data e dimensões.
+
+    Valores ausentes nas dimensões são mantidos como um grupo próprio, para que
+    o cubo sem filtros tenha o mesmo total que as linhas brutas.
+
+    Returns:
+        pd.DataFrame: uma linha por combinação presente nos dados
+    """
+    dimensoes = [coluna for coluna in dimensoes if coluna in df.columns]
+    return (
+        df.groupby([coluna_data] + dimensoes, dropna=False, sort=False)[coluna_valor]
+        .sum()
+        .reset_index()
+    )
+
+
+def obter_cubo(nome):
+    """Cubo da versão atual do conjunto de dados, calculado uma vez e compartilhado."""
+    definicao = CUBOS[nome]
+    return datasets.obter_derivado(nome, 'cubo', lambda df: construir_cubo(df, **definicao))
+
+
+def fatiar(cubo, coluna_data, data_inicial, data_final, filtros):
+    """
+    Recorte do cubo pelo período e pelos filtros.
+
+    Returns:
+        pd.DataFrame: células do cubo que atendem aos filtros, ou None se algum
+        filtro ativo usar uma coluna que não é dimensão do cubo
+    """
+    if any(filtro_ativo(valores) and coluna not in cubo.columns for coluna, valores in filtros.items()):
+        return None
+    return filtrar(cubo, coluna_data, data_inicial, data_final, filtros)
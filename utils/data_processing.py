@@ -1,107 +1,79 @@
 import pandas as pd
-import requests
-from io import BytesIO
-import hashlib
 import logging
-import streamlit as st
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from utils.numeros import limpar_numeros
 
-def calcular_total_importacao(df):
+def _para_numero(serie):
+    """Converte uma coluna textual com vírgula decimal para número, sem alterar o DataFrame."""
+    return limpar_numeros(serie)[0]
+
+def _dados_do_registro(df, nome):
+    """Usa o DataFrame informado ou, se ausente, o do registro de datasets."""
+    if df is not None:
+        return df
+    from utils.datasets import obter_dataset
+    return obter_dataset(nome)
+
+# Colunas de quantidade de contêineres de cada conjunto de dados
+COLUNAS_QUANTIDADE = {
+    'importacao': ['QTDE CONTAINER'],
+    'exportacao': ['QTDE CONTEINER'],
+    'cabotagem': ['QUANTIDADE C20', 'QUANTIDADE C40']
+}
+
+def total_conteineres(df, nome):
+    """
+    Total de contêineres do conjunto de dados.
+
+    Returns:
+        int: soma das colunas de quantidade (0 se o DataFrame estiver vazio ou sem as colunas)
+    """
+    colunas = COLUNAS_QUANTIDADE[nome]
+    if df is None or df.empty or any(coluna not in df.columns for coluna in colunas):
+        return 0
+    return int(sum(_para_numero(df[coluna]).sum() for coluna in colunas))
+
+def periodo_dados(df, coluna_data):
+    """Retorna (data mais antiga, data mais recente) da coluna, como Timestamps."""
+    return df[coluna_data].min(), df[coluna_data].max()
+
+def _formatar_total(total):
+    return f"{total:,.0f}".replace(",", ".")
+
+def calcular_total_importacao(df=None):
     """
     Calcula o total de contêineres de importação.
+    Sem DataFrame, usa os dados do registro de datasets.
     """
     try:
-        if df is None or df.empty:
-            return "0"
-        
-        # Verificar se a coluna existe
-        if 'QTDE CONTAINER' not in df.columns:
-            return "0"
-            
-        # Converter valores de string para número
-        if df['QTDE CONTAINER'].dtype == 'object':
-            df['QTDE CONTAINER'] = pd.to_numeric(
-                df['QTDE CONTAINER'].str.replace(',', '.'), 
-                errors='coerce'
-            ).fillna(0)
-        
-        total = df['QTDE CONTAINER'].sum()
-        return f"{total:,.0f}".replace(",", ".")
+        return _formatar_total(total_conteineres(_dados_do_registro(df, 'importacao'), 'importacao'))
     except Exception as e:
         logging.error(f"Erro ao calcular total de importação: {e}")
         return "0"
 
-def calcular_total_exportacao(df):
+def calcular_total_exportacao(df=None):
     """
     Calcula o total de contêineres de exportação.
+    Sem DataFrame, usa os dados do registro de datasets.
     """
     try:
-        if df is None or df.empty:
-            return "0"
-        
-        # Verificar se a coluna existe
-        if 'QTDE CONTEINER' not in df.columns:
-            return "0"
-            
-        # Converter valores de string para número
-        if df['QTDE CONTEINER'].dtype == 'object':
-            df['QTDE CONTEINER'] = pd.to_numeric(
-                df['QTDE CONTEINER'].str.replace(',', '.'), 
-                errors='coerce'
-            ).fillna(0)
-        
-        total = df['QTDE CONTEINER'].sum()
-        return f"{total:,.0f}".replace(",", ".")
+        return _formatar_total(total_conteineres(_dados_do_registro(df, 'exportacao'), 'exportacao'))
     except Exception as e:
         logging.error(f"Erro ao calcular total de exportação: {e}")
         return "0"
 
-def calcular_total_cabotagem(df):
+def calcular_total_cabotagem(df=None):
     """
     Calcula o total de contêineres de cabotagem.
+    Sem DataFrame, usa os dados do registro de datasets.
     """
     try:
-        if df is None or df.empty:
-            return "0"
-        
-        # Verificar se as colunas existem
-        if 'QUANTIDADE C20' not in df.columns or 'QUANTIDADE C40' not in df.columns:
-            return "0"
-            
-        # Converter valores de string para número
-        for col in ['QUANTIDADE C20', 'QUANTIDADE C40']:
-            if df[col].dtype == 'object':
-                df[col] = pd.to_numeric(
-                    df[col].str.replace(',', '.'), 
-                    errors='coerce'
-                ).fillna(0)
-        
-        total = df['QUANTIDADE C20'].sum() + df['QUANTIDADE C40'].sum()
-        return f"{total:,.0f}".replace(",", ".")
+        return _formatar_total(total_conteineres(_dados_do_registro(df, 'cabotagem'), 'cabotagem'))
     except Exception as e:
         logging.error(f"Erro ao calcular total de cabotagem: {e}")
         return "0"
 
-def create_unique_id_safe(row):
-    """
-    Cria um ID único para cada linha do DataFrame de forma segura.
-    """
-    try:
-        # Concatena os valores das colunas relevantes
-        values = [
-            str(row.get('DATA DE EMBARQUE', '')),
-            str(row.get('QUANTIDADE C20', 0)),
-            str(row.get('QUANTIDADE C40', 0))
-        ]
-        
-        # Cria uma string única
-        unique_string = '_'.join(values)
-        
-        # Gera um hash SHA-256
-        return hashlib.sha256(unique_string.encode()).hexdigest()
-    except Exception as e:
-        logging.error(f"Erro ao criar ID único: {e}")
-        return None
-
 def limpar_numero(valor):
     """Limpa um valor numérico, tratando vírgula como separador decimal"""
     if pd.isna(valor):
@@ -120,90 +92,55 @@ def limpar_numero(valor):
         return float(valor_str)
         
     except Exception as e:
-        st.error(f"Erro ao limpar número: {valor} - {str(e)}")
+        logging.error(f"Erro ao limpar número: {valor} - {str(e)}")
         return 0
 
-@st.cache_data
-def carregar_dados_exportacao():
-    """Carrega os dados de exportação"""
+def _executar_com_tempo(carregador):
+    """Executa um carregador e retorna (resultado, duração em segundos, erro)."""
+    inicio = time.perf_counter()
     try:
-        file_id = st.secrets["urls"]["planilha_exportacao"]
-        url = f"https://docs.google.com/spreadsheets/d/{file_id}/export?format=xlsx"
-        response = requests.get(url)
-        response.raise_for_status()
-        df = pd.read_excel(BytesIO(response.content))
-        df['QTDE CONTEINER'] = df['QTDE CONTEINER'].apply(limpar_numero)
-        return df
+        return carregador(), time.perf_counter() - inicio, None
     except Exception as e:
-        st.error(f"Erro ao carregar dados de exportação: {e}")
-        return pd.DataFrame()
+        return None, time.perf_counter() - inicio, str(e)
 
-@st.cache_data
-def carregar_dados_importacao():
-    """Carrega os dados de importação"""
-    try:
-        file_id = st.secrets["urls"]["planilha_importacao"]
-        url = f"https://docs.google.com/spreadsheets/d/{file_id}/export?format=xlsx"
-        response = requests.get(url)
-        response.raise_for_status()
-        df = pd.read_excel(BytesIO(response.content))
-        df['QTDE CONTAINER'] = df['QTDE CONTAINER'].apply(limpar_numero)
-        return df
-    except Exception as e:
-        st.error(f"Erro ao carregar dados de importação: {e}")
-        return pd.DataFrame()
+def carregar_em_paralelo(carregadores, max_workers=3, usar_processos=False):
+    """
+    Executa os carregadores de dados concorrentemente.
 
-@st.cache_data
-def carregar_dados_cabotagem():
-    """Carrega os dados de cabotagem"""
-    try:
-        file_id = st.secrets["urls"]["planilha_cabotagem"]
-        url = f"https://docs.google.com/spreadsheets/d/{file_id}/export?format=xlsx"
-        response = requests.get(url)
-        response.raise_for_status()
-        df = pd.read_excel(BytesIO(response.content))
-        
-        # Processamento específico para cabotagem
-        df['DATA DE EMBARQUE'] = pd.to_datetime(df['DATA DE EMBARQUE'], format='%Y-%m-%d', errors='coerce')
-        for col in ['QUANTIDADE C20', 'QUANTIDADE C40']:
-            df[col] = df[col].apply(limpar_numero)
-        df['QUANTIDADE TOTAL'] = df['QUANTIDADE C20'] + df['QUANTIDADE C40']
-        
-        return df
-    except Exception as e:
-        st.error(f"Erro ao carregar dados de cabotagem: {e}")
-        return pd.DataFrame()
+    Uma falha em uma fonte não descarta as demais: o erro é registrado e os
+    resultados das outras fontes são mantidos.
 
-def calcular_total_exportacao(df):
-    if df.empty:
-        return "0"
-    try:
-        df['QTDE CONTEINER'] = df['QTDE CONTEINER'].apply(lambda x: str(x).replace(',', '.'))
-        total = df['QTDE CONTEINER'].astype(float).sum()
-        return str(int(total))
-    except Exception as e:
-        st.error(f"Erro ao calcular total de exportações: {e}")
-        return "0"
-
-def calcular_total_importacao(df):
-    if df.empty:
-        return "0"
-    try:
-        df['QTDE CONTAINER'] = df['QTDE CONTAINER'].apply(lambda x: str(x).replace(',', '.'))
-        total = df['QTDE CONTAINER'].astype(float).sum()
-        return str(int(total))
-    except Exception as e:
-        st.error(f"Erro ao calcular total de importações: {e}")
-        return "0"
+    Args:
+        carregadores (dict): nome da fonte -> função sem argumentos que retorna um DataFrame.
+            Com usar_processos=True as funções precisam ser serializáveis
+            (funções de módulo ou functools.partial).
+        max_workers (int): número máximo de fontes carregadas ao mesmo tempo
+        usar_processos (bool): usa um pool de processos em vez de threads
 
+    Returns:
+        tuple: (dados, erros, tempos) com os DataFrames carregados, as mensagens
+        de erro e a duração em segundos de cada fonte
+    """
+    dados, erros, tempos = {}, {}, {}
+    if not carregadores:
+        return dados, erros, tempos
 
-def calcular_total_cabotagem(df):
-    """Calcula o total de cabotagem"""
-    if df.empty:
-        return "0"
-    try:
-        total = int(df['QUANTIDADE TOTAL'].astype(float).sum())
-        return str(total)
-    except Exception as e:
-        st.error(f"Erro ao calcular total de cabotagem: {e}")
-        return "0"
+    executor_cls = ProcessPoolExecutor if usar_processos else ThreadPoolExecutor
+    with executor_cls(max_workers=min(max_workers, len(carregadores))) as executor:
+        futuros = {
+            executor.submit(_executar_com_tempo, carregador): nome
+            for nome, carregador in carregadores.items()
+        }
+        for futuro in as_completed(futuros):
+            nome = futuros[futuro]
+            try:
+                resultado, tempos[nome], erro = futuro.result()
+            except Exception as e:
+                # Falha do próprio pool (ex.: processo encerrado)
+                resultado, erro = None, str(e)
+            if erro is None:
+                dados[nome] = resultado
+            else:
+                logging.error(f"Erro ao carregar {nome}: {erro}")
+                erros[nome] = erro
+    return dados, erros, tempos
@@ -0,0 +1,241 @@
+"""
+Registro único dos conjuntos de dados do dashboard.
+
+A Home, as páginas e os cálculos de totais leem deste módulo, e ele lê apenas
+do consolidado em Parquet (utils.consolidacao). A planilha do Google Sheets
+nunca é acessada no caminho de leitura: a ingestão (utils.ingestao) roda à
+parte, pela thread de utils.atualizacao, e incorpora ao consolidado o que
+mudou. Com isso, o tempo de resposta das páginas não depende da
+disponibilidade do Google Sheets nem da leitura do xlsx, e o histórico além do
+que está na planilha atual é mantido.
+
+Cada conjunto de dados é lido do disco uma única vez por versão do consolidado
+e mantido em cache no processo. Saber se há versão nova custa só um stat do
+índice; quando há, a versão em memória continua sendo servida enquanto a nova
+é lida em segundo plano e trocada de uma só vez. Só na primeira execução, sem
+consolidado em disco, a leitura espera pela ingestão.
+
+Por padrão todo o histórico é carregado. Em config.json, o bloco opcional
+"historico_meses" limita a leitura aos últimos N meses de cada conjunto de
+dados; a leitura então abre apenas as partições desse período. Esse é o
+único filtro de data levado à leitura do Parquet. O período escolhido nas
+páginas não é: cada versão é lida uma vez e compartilhada entre as sessões, os
+totais e os limites dos seletores de data usam todo o período carregado, e o
+recorte em memória pelo índice de datas de utils.filtros (busca binária)
+custa menos que uma leitura do disco a cada mudança de período.
+
+Estruturas calculadas a partir dos dados (cubos, índices) são guardadas junto
+com cada versão por obter_derivado() e descartadas quando ela é trocada.
+
+Os DataFrames retornados são compartilhados entre sessões e não devem ser
+modificados; use .copy() antes de qualquer alteração.
+"""
+import logging
+import threading
+import time
+import pandas as pd
+from utils import consolidacao
+from utils.data_processing import carregar_em_paralelo
+from utils.download import ler_metadados
+from utils.ingestao import DATASETS, TIMEOUT_CARGA, ErroDataset, carregar_config, ingerir_dataset
+from utils.singleflight import SingleFlight
+
+# Intervalo padrão entre as ingestões da planilha
+TTL_PADRAO = 3600
+
+_cache = {}
+# Erro da última ingestão que falhou, por conjunto de dados, enquanto o consolidado em disco é servido
+_falhas = {}
+_lock = threading.Lock()
+_single_flight = SingleFlight()
+
+
+def _data_inicial(nome):
+    """Início do período carregado, conforme "historico_meses" do config.json (None para tudo)."""
+    meses = carregar_config().get('historico_meses', {}).get(nome)
+    if not meses:
+        return None
+    return (pd.Timestamp.now().normalize() - pd.DateOffset(months=meses)).replace(day=1)
+
+
+def _categorizar(nome, df):
+    """
+    Converte as colunas derivadas do conjunto de dados em category, uma vez por
+    versão. Consolidados gravados antes de uma coluna derivada existir têm as
+    colunas recalculadas aqui.
+    """
+    categoricas = DATASETS[nome]['categoricas']
+    if any(coluna not in df.columns for coluna in categoricas):
+        df = DATASETS[nome]['derivar'](df)
+    for coluna in categoricas:
+        df[coluna] = df[coluna].astype('category')
+    return df
+
+
+def _carregar(nome):
+    """Lê o consolidado do disco e troca a versão em memória."""
+    versao = consolidacao.versao_consolidado(nome)
+    df = consolidacao.ler_consolidado(nome, data_inicial=_data_inicial(nome))
+    if df.empty:
+        raise ErroDataset(f"Não há dados consolidados de {DATASETS[nome]['descricao']}.")
+    df = _categorizar(nome, df)
+    with _lock:
+        _cache[nome] = {'versao': versao, 'df': df, 'derivados': {}}
+    return df
+
+
+def recarregar_dataset(nome, timeout=TIMEOUT_CARGA):
+    """
+    Relê o consolidado do disco. Chamadas simultâneas compartilham a mesma leitura.
+
+    Returns:
+        pd.DataFrame: dados da versão atual do consolidado
+    """
+    try:
+        return _single_flight.executar(nome, lambda: _carregar(nome), timeout=timeout)
+    except TimeoutError as e:
+        raise ErroDataset(f"Tempo esgotado ao carregar {DATASETS[nome]['descricao']}.") from e
+
+
+def atualizar_dataset(nome, timeout=TIMEOUT_CARGA):
+    """
+    Ingere a planilha no consolidado e, se algo mudou, relê a nova versão.
+
+    Se a ingestão falhar (ex.: sem rede) e já houver consolidado em disco,
+    inclusive o importado dos arquivos antigos do projeto, ele é servido e o
+    erro fica disponível em falha_atualizacao().
+
+    Returns:
+        pd.DataFrame: dados da versão atual
+
+    Raises:
+        ErroDataset: se a planilha não puder ser validada ou a espera exceder o
+            timeout e não houver consolidado em disco
+    """
+    try:
+        ingerir_dataset(nome, timeout=timeout)
+    except Exception as e:
+        if consolidacao.versao_consolidado(nome) is None:
+            raise
+        logging.error(f"Erro ao atualizar {nome}; usando o consolidado em disco: {e}")
+        with _lock:
+            _falhas[nome] = str(e)
+    else:
+        with _lock:
+            _falhas.pop(nome, None)
+
+    with _lock:
+        entrada = _cache.get(nome)
+    if entrada is not None and entrada['versao'] == consolidacao.versao_consolidado(nome):
+        return entrada['df']
+    return recarregar_dataset(nome, timeout=timeout)
+
+
+def _recarregar_em_segundo_plano(nome):
+    """Dispara a releitura do consolidado em uma thread, se ainda não houver uma."""
+    if _single_flight.em_andamento(nome):
+        return
+
+    def executar():
+        try:
+            recarregar_dataset(nome)
+        except Exception as e:
+            logging.error(f"Erro ao recarregar {nome} em segundo plano: {e}")
+
+    threading.Thread(target=executar, name=f"recarregar-{nome}", daemon=True).start()
+
+
+def obter_dataset(nome):
+    """
+    Retorna o conjunto de dados consolidado, usando o cache compartilhado do processo.
+
+    A versão em memória é sempre devolvida imediatamente; se o consolidado em
+    disco tiver mudado, a nova versão é lida em segundo plano. Sem versão em
+    memória, o consolidado é lido do disco, e só se ele ainda não existir a
+    planilha é ingerida antes de retornar.
+
+    Args:
+        nome (str): 'importacao', 'exportacao' ou 'cabotagem'
+
+    Returns:
+        pd.DataFrame: dados limpos (compartilhados, não modificar)
+
+    Raises:
+        ErroDataset: se não houver dados e a planilha não puder ser validada
+    """
+    if nome not in DATASETS:
+        raise KeyError(f"Conjunto de dados desconhecido: {nome}")
+
+    with _lock:
+        entrada = _cache.get(nome)
+    if entrada is None:
+        if consolidacao.versao_consolidado(nome) is None:
+            return atualizar_dataset(nome)
+        return recarregar_dataset(nome)
+
+    if entrada['versao'] != consolidacao.versao_consolidado(nome):
+        _recarregar_em_segundo_plano(nome)
+    return entrada['df']
+
+
+def obter_derivado(nome, chave, construtor):
+    """
+    Estrutura derivada do conjunto de dados (cubo, índice etc.), calculada uma
+    única vez por versão do consolidado e compartilhada entre as sessões.
+
+    Args:
+        nome (str): conjunto de dados
+        chave (str): identificador da estrutura
+        construtor (callable): recebe o DataFrame e retorna a estrutura
+
+    Returns:
+        A estrutura construída para a versão em memória do conjunto de dados
+    """
+    obter_dataset(nome)
+    with _lock:
+        entrada = _cache[nome]
+        if chave in entrada['derivados']:
+            return entrada['derivados'][chave]
+
+    derivado = _single_flight.executar(
+        (nome, entrada['versao'], chave), lambda: construtor(entrada['df']), timeout=TIMEOUT_CARGA
+    )
+    with _lock:
+        return entrada['derivados'].setdefault(chave, derivado)
+
+
+def idade_dataset(nome):
+    """
+    Segundos desde a última verificação da planilha pela ingestão, mesmo que
+    ela não tenha mudado (revalidação 304 ou mesmo hash), ou None se ela ainda
+    não foi baixada.
+    """
+    verificado = ler_metadados(nome).get('verificado_em')
+    return time.time() - verificado if verificado is not None else None
+
+
+def falha_atualizacao(nome):
+    """Erro da última ingestão, se ela falhou e os dados servidos estão desatualizados; senão None."""
+    with _lock:
+        return _falhas.get(nome)
+
+
+def obter_datasets(nomes=None, max_workers=3):
+    """
+    Carrega vários conjuntos de dados em paralelo pelo registro.
+
+    Returns:
+        tuple: (dados, erros, tempos), como em carregar_em_paralelo
+    """
+    nomes = list(DATASETS) if nomes is None else nomes
+    carregadores = {nome: (lambda nome=nome: obter_dataset(nome)) for nome in nomes}
+    return carregar_em_paralelo(carregadores, max_workers=max_workers)
+
+
+def limpar_cache(nome=None):
+    """Descarta o cache de um conjunto de dados ou de todos."""
+    with _lock:
+        if nome is None:
+            _cache.clear()
+        else:
+            _cache.pop(nome, None)
@@ -0,0 +1,116 @@
+"""
+Download das planilhas com cache em disco e revalidação condicional.
+
+O último conteúdo baixado de cada fonte fica salvo em disco junto com o ETag,
+o Last-Modified e o hash SHA-256 do conteúdo. As requisições seguintes enviam
+If-None-Match/If-Modified-Since; quando o servidor responde 304, ou quando o
+conteúdo baixado tem o mesmo hash, o chamador é avisado de que nada mudou e
+pode pular a leitura da planilha.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from collections import namedtuple
+import requests
+
+DIRETORIO_CACHE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'downloads')
+
+Download = namedtuple('Download', ['conteudo', 'hash', 'alterado'])
+
+
+def _caminhos(nome, diretorio):
+    """Caminhos do conteúdo e dos metadados de uma fonte."""
+    return (
+        os.path.join(diretorio, f"{nome}.bin"),
+        os.path.join(diretorio, f"{nome}.json")
+    )
+
+
+def escrever_atomico(caminho, dados):
+    """Grava bytes em um arquivo temporário e o move para o destino de uma só vez."""
+    diretorio = os.path.dirname(caminho)
+    os.makedirs(diretorio, exist_ok=True)
+    fd, temporario = tempfile.mkstemp(dir=diretorio, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(dados)
+        os.replace(temporario, caminho)
+    except Exception:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+def ler_metadados(nome, diretorio=None):
+    """Retorna os metadados do último download da fonte, ou {} se não houver."""
+    diretorio = diretorio or DIRETORIO_CACHE
+    _, caminho_meta = _caminhos(nome, diretorio)
+    try:
+        with open(caminho_meta, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _ler_conteudo(nome, diretorio):
+    caminho_conteudo, _ = _caminhos(nome, diretorio)
+    try:
+        with open(caminho_conteudo, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def baixar_com_cache(nome, url, timeout=30, diretorio=None):
+    """
+    Baixa o conteúdo da URL reaproveitando o cache em disco.
+
+    Args:
+        nome (str): identificador da fonte, usado como nome dos arquivos de cache
+        url (str): endereço do arquivo
+        timeout (int): tempo limite da requisição em segundos
+        diretorio (str): pasta do cache (DIRETORIO_CACHE se omitido)
+
+    Returns:
+        Download: conteúdo, hash SHA-256 e se o conteúdo mudou desde o último download
+    """
+    diretorio = diretorio or DIRETORIO_CACHE
+    meta = ler_metadados(nome, diretorio)
+    conteudo_anterior = _ler_conteudo(nome, diretorio) if meta.get('url') == url else None
+
+    headers = {}
+    if conteudo_anterior is not None:
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+    response = requests.get(url, headers=headers, timeout=timeout)
+
+    if response.status_code == 304 and conteudo_anterior is not None:
+        logging.info(f"{nome}: conteúdo não modificado (304)")
+        meta['verificado_em'] = time.time()
+        _, caminho_meta = _caminhos(nome, diretorio)
+        escrever_atomico(caminho_meta, json.dumps(meta).encode('utf-8'))
+        return Download(conteudo_anterior, meta['hash'], False)
+
+    response.raise_for_status()
+    conteudo = response.content
+    hash_conteudo = hashlib.sha256(conteudo).hexdigest()
+    alterado = conteudo_anterior is None or hash_conteudo != meta.get('hash')
+
+    caminho_conteudo, caminho_meta = _caminhos(nome, diretorio)
+    if alterado:
+        escrever_atomico(caminho_conteudo, conteudo)
+    meta = {
+        'url': url,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'hash': hash_conteudo,
+        'verificado_em': time.time()
+    }
+    escrever_atomico(caminho_meta, json.dumps(meta).encode('utf-8'))
+    return Download(conteudo, hash_conteudo, alterado)
@@ -0,0 +1,152 @@
+"""
+Agrupamento das grafias de um mesmo nome de empresa em uma entidade canônica.
+
+Os nomes de consignatários, exportadores, remetentes e destinatários vêm de
+planilhas digitadas e variam em acentos, pontuação e sufixos ('COMERCIO LTDA.',
+'Comércio Ltda', 'COMERCIO S/A'). Cada nome distinto é reduzido a uma chave
+(normalizar_texto, sem sufixos societários nem preposições); nomes com a mesma
+chave são a mesma entidade. Chaves parecidas (erros de digitação) são
+comparadas apenas dentro de blocos (mesma primeira palavra ou mesma palavra
+mais longa), e só com as vizinhas na ordem alfabética do bloco, pela
+semelhança de Jaccard dos trigramas; o custo cresce com o número de nomes, não
+com o seu quadrado.
+
+O nome canônico de cada entidade é a grafia mais frequente nos dados. As
+entidades são calculadas uma vez por versão do conjunto de dados
+(datasets.obter_derivado) e usadas como colunas de filtro ("<coluna> -
+ENTIDADE") pelo índice de utils.filtros e, por com_entidades(), como dimensão
+das tabelas dinâmicas.
+"""
+from collections import Counter, defaultdict
+from utils import datasets
+from utils.busca import normalizar_texto
+
+# Colunas de nomes de empresas de cada conjunto de dados
+COLUNAS_ENTIDADE = {
+    'importacao': ['CONSIGNATÁRIO', 'CONSIGNATARIO FINAL', 'NOME EXPORTADOR'],
+    'exportacao': ['NOME EXPORTADOR', 'CONSIGNATÁRIO'],
+    'cabotagem': ['REMETENTE', 'DESTINATÁRIO']
+}
+
+# Palavras ignoradas na chave: sufixos societários e preposições
+SUFIXOS = {'LTDA', 'LTD', 'SA', 'EIRELI', 'ME', 'EPP', 'CIA', 'INC', 'LLC', 'CO', 'LIMITED', 'PTE', 'GMBH'}
+PREPOSICOES = {'DE', 'DA', 'DO', 'DAS', 'DOS', 'E'}
+
+# Semelhança mínima (Jaccard dos trigramas) para unir duas chaves diferentes
+LIMIAR_SIMILARIDADE = 0.85
+# Quantas chaves seguintes, na ordem do bloco, cada chave é comparada
+JANELA_COMPARACAO = 8
+
+
+def coluna_entidade(coluna):
+    """Nome da coluna de entidades derivada de `coluna`."""
+    return f"{coluna} - ENTIDADE"
+
+
+def chave_nome(nome):
+    """
+    Chave de comparação de um nome de empresa.
+
+    Letras isoladas seguidas são juntadas ('S A' -> 'SA', 'A V S' -> 'AVS')
+    antes de remover sufixos e preposições:
+    'Comércio de Peças S/A' -> 'COMERCIO PECAS'.
+    """
+    palavras = []
+    juntando = False
+    for palavra in normalizar_texto(nome).split():
+        isolada = len(palavra) == 1 and palavra.isalpha()
+        if isolada and juntando:
+            palavras[-1] += palavra
+        else:
+            palavras.append(palavra)
+        juntando = isolada
+    palavras = [palavra for palavra in palavras if palavra not in SUFIXOS and palavra not in PREPOSICOES]
+    return ' '.join(palavras)
+
+
+def _trigramas(chave):
+    texto = f" {chave} "
+    return {texto[inicio:inicio + 3] for inicio in range(len(texto) - 2)}
+
+
+def _similaridade(a, b):
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+class Entidades:
+    """Entidade canônica de cada grafia de nome das colunas indicadas."""
+
+    def __init__(self, df, colunas):
+        self.colunas = [coluna for coluna in colunas if coluna in df.columns]
+        frequencias = Counter()
+        for coluna in self.colunas:
+            frequencias.update(df[coluna].dropna().astype(str).value_counts().to_dict())
+
+        chave_por_nome = {nome: chave_nome(nome) for nome in frequencias}
+        chaves = sorted(set(chave_por_nome.values()))
+        grupo = self._agrupar(chaves)
+
+        # A grafia mais frequente (e, no empate, a primeira em ordem alfabética) nomeia a entidade
+        nomes_por_grupo = defaultdict(list)
+        for nome, chave in chave_por_nome.items():
+            nomes_por_grupo[grupo[chave]].append(nome)
+        canonico = {
+            id_grupo: min(nomes, key=lambda nome: (-frequencias[nome], nome))
+            for id_grupo, nomes in nomes_por_grupo.items()
+        }
+        self.entidade_por_nome = {nome: canonico[grupo[chave]] for nome, chave in chave_por_nome.items()}
+
+    @staticmethod
+    def _agrupar(chaves):
+        """Une as chaves semelhantes; retorna chave -> identificador do grupo."""
+        pai = list(range(len(chaves)))
+
+        def raiz(i):
+            while pai[i] != i:
+                pai[i] = pai[pai[i]]
+                i = pai[i]
+            return i
+
+        blocos = defaultdict(list)
+        for i, chave in enumerate(chaves):
+            palavras = chave.split()
+            if not palavras:
+                continue
+            blocos[('primeira', palavras[0])].append(i)
+            blocos[('maior', max(palavras, key=len))].append(i)
+
+        trigramas = {}
+        for membros in blocos.values():
+            # As chaves já estão em ordem alfabética, e os blocos mantêm essa ordem
+            for posicao, i in enumerate(membros):
+                for j in membros[posicao + 1:posicao + 1 + JANELA_COMPARACAO]:
+                    if raiz(i) == raiz(j):
+                        continue
+                    a = trigramas.setdefault(i, _trigramas(chaves[i]))
+                    b = trigramas.setdefault(j, _trigramas(chaves[j]))
+                    if _similaridade(a, b) >= LIMIAR_SIMILARIDADE:
+                        pai[raiz(j)] = raiz(i)
+
+        return {chave: raiz(i) for i, chave in enumerate(chaves)}
+
+    def colunas_entidade(self, df):
+        """
+        Colunas de entidades de `df`, uma por coluna de nomes.
+
+        Returns:
+            dict: nome da coluna de entidades -> pd.Series alinhada a `df`
+        """
+        return {
+            coluna_entidade(coluna): df[coluna].where(df[coluna].isna(), df[coluna].astype(str)).map(self.entidade_por_nome)
+            for coluna in self.colunas
+        }
+
+
+def obter_entidades(nome):
+    """Entidades da versão atual do conjunto de dados, calculadas uma vez e compartilhadas."""
+    return datasets.obter_derivado(nome, 'entidades', lambda df: Entidades(df, COLUNAS_ENTIDADE[nome]))
+
+
+def com_entidades(df, nome):
+    """Cópia de `df` com as colunas de entidades, para usá-las como dimensão de tabelas dinâmicas."""
+    return df.assign(**obter_entidades(nome).colunas_entidade(df))
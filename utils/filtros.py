@@ -0,0 +1,374 @@
+"""
+Filtros das páginas, sem dependência do Streamlit.
+
+As páginas montam os widgets e passam as seleções para estas funções, que
+recebem e devolvem DataFrames. Nos filtros de múltipla escolha, a opção
+"Todos" (ou nenhuma seleção) não restringe a coluna. A busca textual entra
+no mesmo dicionário de filtros, na chave BUSCA, como uma lista com o texto.
+
+As posições filtradas e as tabelas montadas a partir delas ficam em um cache
+LRU compartilhado entre as sessões (RESULTADOS), chaveado pela versão do
+índice e pelo estado normalizado dos filtros.
+"""
+import itertools
+import numpy as np
+import pandas as pd
+from utils import datasets
+from utils.busca import COLUNAS_BUSCA, IndiceBusca
+from utils.data_processing import COLUNAS_QUANTIDADE
+from utils.entidades import obter_entidades
+from utils.ingestao import DATASETS
+from utils.lru import CacheLRU
+
+TODOS = "Todos"
+# Chave da busca textual no dicionário de filtros (não é uma coluna dos dados)
+BUSCA = "BUSCA"
+# Memória máxima dos resultados de filtros guardados
+LIMITE_CACHE_BYTES = 64 * 1024 * 1024
+
+RESULTADOS = CacheLRU(LIMITE_CACHE_BYTES)
+# Cada IndiceFiltros (um por versão de conjunto de dados) recebe uma geração única
+_geracoes = itertools.count()
+
+
+def filtro_ativo(valores):
+    """Indica se a seleção de um multiselect restringe a coluna."""
+    return bool(valores) and TODOS not in valores
+
+
+def normalizar_filtros(data_inicial, data_final, filtros):
+    """
+    Chave imutável do estado dos filtros: as datas como date e só as seleções
+    ativas, com colunas e valores em ordem. Seleções equivalentes (outra ordem,
+    "Todos", filtros vazios) geram a mesma chave.
+    """
+    def dia(data):
+        return None if data is None else pd.Timestamp(data).date()
+
+    selecoes = tuple(sorted(
+        (coluna, tuple(sorted(map(str, set(valores)))))
+        for coluna, valores in filtros.items() if filtro_ativo(valores)
+    ))
+    return dia(data_inicial), dia(data_final), selecoes
+
+
+def mascara_periodo(datas, data_inicial, data_final):
+    """Máscara das linhas com data entre data_inicial e data_final (dias inteiros, inclusive)."""
+    mascara = pd.Series(True, index=datas.index)
+    if data_inicial is not None:
+        mascara &= datas >= pd.Timestamp(data_inicial)
+    if data_final is not None:
+        mascara &= datas < pd.Timestamp(data_final).normalize() + pd.Timedelta(days=1)
+    return mascara
+
+
+def filtrar(df, coluna_data, data_inicial, data_final, filtros):
+    """
+    Aplica o período e os filtros de múltipla escolha.
+
+    Args:
+        df (pd.DataFrame): dados do registro (não é modificado)
+        coluna_data (str): coluna de data usada no período
+        data_inicial, data_final (date): período, inclusive
+        filtros (dict): coluna -> valores selecionados
+
+    Returns:
+        pd.DataFrame: linhas que atendem a todos os filtros
+    """
+    mascara = mascara_periodo(df[coluna_data], data_inicial, data_final)
+    for coluna, valores in filtros.items():
+        if filtro_ativo(valores) and coluna in df.columns:
+            mascara &= df[coluna].isin(valores)
+    return df[mascara]
+
+
+def datas_disponiveis(df, coluna_data):
+    """Datas presentes na coluna, formatadas (dd/mm/aaaa), da mais recente para a mais antiga."""
+    datas = df[coluna_data].dropna().drop_duplicates().sort_values(ascending=False)
+    return datas.dt.strftime('%d/%m/%Y').drop_duplicates().tolist()
+
+
+# Colunas de múltipla escolha de cada página, indexadas por IndiceFiltros
+# (os nomes de empresas são indexados pelas suas entidades, de utils.entidades)
+COLUNAS_FILTRO = {
+    'importacao': ['UF CONSIGNATÁRIO', 'PORTO DESCARGA', 'ARMADOR', 'CONSOLIDADOR'],
+    'exportacao': ['ESTADO EXPORTADOR', 'PORTO EMBARQUE', 'ARMADOR']
+}
+
+
+# Dia usado para as linhas sem data, que ficam no fim do índice
+SEM_DATA = np.iinfo(np.int32).max
+
+
+def numero_do_dia(data):
+    """Número do dia (dias desde 01/01/1970) de uma data."""
+    return int(np.datetime64(pd.Timestamp(data).date(), 'D').astype(np.int64))
+
+
+class IndiceDatas:
+    """
+    Índice da coluna de data de um conjunto de dados.
+
+    As datas são guardadas como números de dia int32, em ordem crescente, e um
+    período vira um intervalo de posições por busca binária (searchsorted),
+    sem comparar linha a linha nem criar objetos date. O registro já entrega
+    os dados ordenados por data; se não estiverem, a ordem é guardada à parte.
+    """
+
+    def __init__(self, datas):
+        dias = datas.to_numpy(dtype='datetime64[ns]').astype('datetime64[D]')
+        nulos = np.isnat(dias)
+        dias = dias.astype(np.int64)
+        dias[nulos] = SEM_DATA
+        dias = dias.astype(np.int32)
+
+        self.ordem = None
+        if len(dias) and np.any(dias[1:] < dias[:-1]):
+            self.ordem = np.argsort(dias, kind='stable')
+            dias = dias[self.ordem]
+        self.dias = dias
+
+    def intervalo(self, data_inicial, data_final):
+        """Posições [inicio, fim) do índice ordenado com data no período (dias inteiros, inclusive)."""
+        if data_inicial is None and data_final is None:
+            return 0, len(self.dias)
+        inicio = 0 if data_inicial is None else np.searchsorted(self.dias, numero_do_dia(data_inicial), 'left')
+        limite = SEM_DATA if data_final is None else numero_do_dia(data_final) + 1
+        return int(inicio), int(np.searchsorted(self.dias, limite, 'left'))
+
+    def posicoes(self, data_inicial, data_final):
+        """Posições (iloc), em ordem crescente, das linhas com data no período."""
+        inicio, fim = self.intervalo(data_inicial, data_final)
+        if self.ordem is None:
+            return np.arange(inicio, fim)
+        return np.sort(self.ordem[inicio:fim])
+
+
+class IndiceFiltros:
+    """
+    Índice dos filtros de um conjunto de dados.
+
+    O período é resolvido pelo IndiceDatas em um intervalo de linhas. Cada
+    coluna filtrável é guardada como códigos inteiros (um por linha) e a
+    lista de valores distintos; uma seleção vira uma tabela booleana por
+    código, e a máscara da coluna é uma única indexação dessa tabela pelos
+    códigos do intervalo. Nenhum DataFrame intermediário é criado. Os
+    mesmos códigos dão as facetas: os valores de cada coluna que ainda têm
+    linhas sob as demais seleções, com o total de contêineres.
+
+    A busca textual (chave BUSCA) é resolvida pelo IndiceBusca recebido e
+    combinada às demais máscaras. Colunas derivadas que não estão em `df`,
+    como as entidades de utils.entidades, entram por `extras`. Filtros em
+    colunas fora do índice são ignorados, como colunas ausentes em filtrar().
+    """
+
+    def __init__(self, df, colunas, coluna_data, coluna_valor=None, busca=None, extras=None):
+        self.df = df
+        self.busca = busca
+        self.geracao = next(_geracoes)
+        self.datas = IndiceDatas(df[coluna_data])
+        # Quantidade somada nas facetas (sem coluna de valor, cada linha vale 1)
+        if coluna_valor in df.columns:
+            self.quantidades = pd.to_numeric(df[coluna_valor], errors='coerce').fillna(0).to_numpy(dtype=float)
+        else:
+            self.quantidades = np.ones(len(df))
+        # Colunas derivadas (ex.: entidades) são indexadas sem serem acrescentadas a df
+        extras = extras or {}
+        self.colunas = list(colunas) + list(extras)
+        self.codigos = {}
+        self.valores = {}
+        for coluna in self.colunas:
+            if coluna in extras:
+                serie = extras[coluna]
+            elif coluna in df.columns:
+                serie = df[coluna]
+            else:
+                continue
+            # Os valores são comparados como texto, como nas opções dos multiselects
+            codigos, valores = pd.factorize(serie.where(serie.isna(), serie.astype(str)), sort=True)
+            self.codigos[coluna] = codigos
+            self.valores[coluna] = valores
+        # Último resultado de filtrar(), como (chave, DataFrame)
+        self._ultimo = (None, None)
+
+    def _mascara_coluna(self, coluna, valores, linhas):
+        """Máscara booleana, sobre `linhas`, da seleção de uma coluna; None se ela não restringir."""
+        if coluna == BUSCA and self.busca is not None:
+            return self.busca.mascara(' '.join(valores), linhas) if filtro_ativo(valores) else None
+        if not filtro_ativo(valores) or coluna not in self.codigos:
+            return None
+        selecionados = np.zeros(len(self.valores[coluna]) + 1, dtype=bool)
+        encontrados = self.valores[coluna].get_indexer(list(valores))
+        selecionados[encontrados[encontrados >= 0]] = True
+        # Nulos têm código -1, que aponta para a última posição (sempre False)
+        return selecionados[self.codigos[coluna][linhas]]
+
+    def _mascara(self, filtros, linhas, ignorar=None):
+        """Máscara booleana, sobre `linhas`, dos filtros indexados (exceto `ignorar`); None se nenhum estiver ativo."""
+        mascara = None
+        for coluna, valores in filtros.items():
+            if coluna == ignorar:
+                continue
+            coluna_mascara = self._mascara_coluna(coluna, valores, linhas)
+            if coluna_mascara is not None:
+                mascara = coluna_mascara if mascara is None else mascara & coluna_mascara
+        return mascara
+
+    def _linhas_periodo(self, data_inicial, data_final):
+        """Linhas do período: um slice se os dados estão em ordem de data, senão as posições."""
+        if self.datas.ordem is None:
+            return slice(*self.datas.intervalo(data_inicial, data_final))
+        return self.datas.posicoes(data_inicial, data_final)
+
+    def _calcular_posicoes(self, data_inicial, data_final, filtros):
+        linhas = self._linhas_periodo(data_inicial, data_final)
+        posicoes = np.arange(linhas.start, linhas.stop) if isinstance(linhas, slice) else linhas
+        mascara = self._mascara(filtros, linhas)
+        return posicoes if mascara is None else posicoes[mascara]
+
+    def _calcular_facetas(self, data_inicial, data_final, filtros):
+        linhas = self._linhas_periodo(data_inicial, data_final)
+        quantidades = self.quantidades[linhas]
+        # Colunas ausentes dos dados não têm opções
+        facetas = {coluna: pd.Series(dtype=np.int64, name=coluna) for coluna in self.colunas}
+        for coluna, codigos in self.codigos.items():
+            codigos = codigos[linhas]
+            pesos = quantidades
+            # Cada coluna é contada sob as seleções das demais, não sob a própria
+            mascara = self._mascara(filtros, linhas, ignorar=coluna)
+            if mascara is not None:
+                codigos = codigos[mascara]
+                pesos = pesos[mascara]
+            validos = codigos >= 0
+            tamanho = len(self.valores[coluna])
+            linhas_por_valor = np.bincount(codigos[validos], minlength=tamanho)
+            totais = np.bincount(codigos[validos], weights=pesos[validos], minlength=tamanho)
+            presentes = np.flatnonzero(linhas_por_valor)
+            facetas[coluna] = pd.Series(
+                totais[presentes].round().astype(np.int64), index=self.valores[coluna][presentes], name=coluna
+            )
+        return facetas
+
+    def facetas(self, data_inicial, data_final, filtros):
+        """
+        Valores disponíveis em cada coluna indexada sob o período e as seleções
+        das outras colunas, com o total de contêineres de cada um.
+
+        Returns:
+            dict: coluna -> pd.Series (valor -> total), em ordem alfabética;
+            valores sem nenhuma linha sob as demais seleções ficam de fora
+        """
+        return self.memorizar(
+            'facetas', data_inicial, data_final, filtros,
+            lambda: self._calcular_facetas(data_inicial, data_final, filtros)
+        )
+
+    def memorizar(self, tipo, data_inicial, data_final, filtros, construtor):
+        """
+        Resultado de `construtor()` para este estado dos filtros, guardado em RESULTADOS.
+
+        Args:
+            tipo (str): o que está sendo guardado (ex.: 'posicoes', 'pivot')
+            data_inicial, data_final, filtros: estado dos filtros da página
+            construtor (callable): função sem argumentos que calcula o resultado
+
+        Returns:
+            O resultado compartilhado (não modificar)
+        """
+        chave = (self.geracao, tipo, normalizar_filtros(data_inicial, data_final, filtros))
+        return RESULTADOS.obter(chave, construtor)
+
+    def posicoes(self, data_inicial, data_final, filtros):
+        """Posições (iloc) das linhas que atendem ao período e aos filtros."""
+        return self.memorizar(
+            'posicoes', data_inicial, data_final, filtros,
+            lambda: self._calcular_posicoes(data_inicial, data_final, filtros)
+        )
+
+    def filtrar(self, data_inicial, data_final, filtros):
+        """
+        Linhas do DataFrame indexado que atendem ao período e aos filtros.
+
+        O resultado é calculado uma vez por estado dos filtros
+        (normalizar_filtros) e reaproveitado por todos os componentes da página
+        que o pedirem na mesma execução; ele é compartilhado e não deve ser
+        modificado.
+        """
+        chave = normalizar_filtros(data_inicial, data_final, filtros)
+        ultima_chave, resultado = self._ultimo
+        if ultima_chave != chave:
+            resultado = self.df.iloc[self.posicoes(data_inicial, data_final, filtros)]
+            self._ultimo = (chave, resultado)
+        return resultado
+
+
+def estatisticas_cache():
+    """Acertos, taxa de acerto e memória do cache de resultados de filtros (CacheLRU.estatisticas)."""
+    return RESULTADOS.estatisticas()
+
+
+def obter_indice(nome):
+    """Índice de filtros da versão atual do conjunto de dados, calculado uma vez e compartilhado."""
+    coluna_data = DATASETS[nome]['coluna_data']
+    coluna_valor = COLUNAS_QUANTIDADE[nome][0]
+    return datasets.obter_derivado(
+        nome, 'indice_filtros',
+        lambda df: IndiceFiltros(
+            df, COLUNAS_FILTRO[nome], coluna_data, coluna_valor,
+            busca=IndiceBusca(df, COLUNAS_BUSCA[nome]),
+            extras=obter_entidades(nome).colunas_entidade(df)
+        )
+    )
+
+
+class IndiceEstadosCabotagem:
+    """
+    Índice (data, UF) -> posições das operações de cabotagem do dia com origem
+    ou destino na UF, montado uma vez por versão dos dados. O detalhamento por
+    estado vira uma consulta a um dicionário, e as UFs com operações em cada
+    data saem do mesmo índice.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        dias = df['DATA DE EMBARQUE'].to_numpy(dtype='datetime64[ns]').astype('datetime64[D]')
+        com_data = ~np.isnat(dias)
+        dias = dias.astype(np.int64)
+
+        # Uma linha por (posição, dia, UF) em cada papel; quem tem origem e destino na
+        # mesma UF aparece uma vez só
+        papeis = pd.concat([
+            pd.DataFrame({'posicao': np.arange(len(df)), 'dia': dias, 'uf': df[coluna].astype(object)})[com_data]
+            for coluna in ('ESTADO_ORIGEM', 'ESTADO_DESTINO')
+        ])
+        papeis = papeis[papeis['uf'].notna()].drop_duplicates()
+        posicoes = papeis['posicao'].to_numpy()
+        self.grupos = {
+            (int(dia), uf): np.sort(posicoes[linhas])
+            for (dia, uf), linhas in papeis.groupby(['dia', 'uf']).indices.items()
+        }
+
+        # UFs oferecidas são as de destino; a origem é extraída do texto livre da
+        # cidade do remetente e nem sempre é uma UF
+        ufs_validas = set(df['ESTADO_DESTINO'].dropna().astype(str))
+        self.estados_por_dia = {}
+        for dia, uf in self.grupos:
+            if uf in ufs_validas:
+                self.estados_por_dia.setdefault(dia, set()).add(uf)
+
+    def estados(self, data):
+        """UFs com operações (origem ou destino) na data, em ordem alfabética."""
+        return sorted(self.estados_por_dia.get(numero_do_dia(data), ()))
+
+    def posicoes(self, data, uf):
+        """Posições (iloc) das operações da data com origem ou destino na UF."""
+        return self.grupos.get((numero_do_dia(data), uf), np.array([], dtype=np.int64))
+
+    def filtrar(self, data, uf):
+        """Operações da data com origem ou destino na UF (df não é modificado)."""
+        return self.df.iloc[self.posicoes(data, uf)]
+
+
+def obter_indice_estados_cabotagem():
+    """Índice (data, UF) da versão atual da cabotagem, calculado uma vez e compartilhado."""
+    return datasets.obter_derivado('cabotagem', 'indice_estados', IndiceEstadosCabotagem)
@@ -0,0 +1,139 @@
+"""
+Geração vetorizada do ID_UNICO dos registros.
+
+O ID é um hash de 64 bits (uint64) calculado coluna a coluna sobre as colunas
+chave de cada conjunto de dados, em vez de um hexdigest md5/SHA-256 montado
+linha a linha. É a única definição de ID usada pelo dashboard.
+
+Os arquivos dados_*_consolidados.parquet antigos guardam o ID como texto
+hexadecimal; migrar_ids_parquet recalcula os IDs no formato novo e verifica
+colisões. Para migrar todos os arquivos do projeto:
+    python -m utils.ids
+"""
+import logging
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+# Colunas que identificam um registro em cada conjunto de dados
+CHAVES_ID = {
+    'cabotagem': [
+        'DATA DE EMBARQUE', 'PORTO DE ORIGEM', 'PORTO DE DESTINO',
+        'NAVIO', 'VIAGEM', 'REMETENTE', 'DESTINATÁRIO'
+    ],
+    'importacao': [
+        'EMBARQUE', 'CONSIGNATÁRIO', 'ETA', 'PORTO DESTINO', 'CONTAINER PARCIAL', 'VIAGEM'
+    ],
+    # Quantidade e peso ficam de fora: são corrigidos na planilha e não identificam o embarque
+    'exportacao': [
+        'DATA EMBARQUE', 'NAVIO', 'VIAGEM', 'NOME EXPORTADOR', 'CONSIGNATÁRIO',
+        'PORTO EMBARQUE', 'PORTO DESCARGA', 'PORTO DE DESTINO', 'PAÍS DE DESTINO', 'HS CODE'
+    ]
+}
+
+ARQUIVOS_CONSOLIDADOS = {
+    'importacao': 'dados_consolidados.parquet',
+    'exportacao': 'dados_exportacao_consolidados.parquet',
+    'cabotagem': 'dados_cabotagem_consolidados.parquet'
+}
+
+
+def _normalizar_chaves(df, colunas):
+    """Converte as colunas chave para texto, de forma estável entre leituras."""
+    chaves = {}
+    for coluna in colunas:
+        if coluna not in df.columns:
+            chaves[coluna] = pd.Series('', index=df.index, dtype='string')
+            continue
+        serie = df[coluna]
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            serie = serie.dt.strftime('%Y-%m-%d')
+        elif pd.api.types.is_float_dtype(serie):
+            # 2.0 e '2' devem gerar o mesmo ID
+            serie = serie.astype('string').str.replace(r'\.0$', '', regex=True)
+        chaves[coluna] = serie.astype('string').fillna('')
+    return pd.DataFrame(chaves, index=df.index)
+
+
+def gerar_ids(df, colunas):
+    """
+    Gera o ID_UNICO de cada linha a partir das colunas chave.
+
+    Colunas ausentes contam como texto vazio.
+
+    Returns:
+        np.ndarray: IDs uint64, um por linha
+    """
+    if df.empty:
+        return np.array([], dtype=np.uint64)
+    return pd.util.hash_pandas_object(_normalizar_chaves(df, colunas), index=False).to_numpy(dtype=np.uint64)
+
+
+def gerar_hash_linhas(df, ignorar=()):
+    """
+    Hash uint64 do conteúdo completo de cada linha, usado para detectar
+    registros alterados. As colunas são consideradas em ordem alfabética.
+    """
+    colunas = sorted(coluna for coluna in df.columns if coluna not in ignorar)
+    return gerar_ids(df, colunas)
+
+
+def ids_no_formato_atual(df, coluna_id='ID_UNICO'):
+    """Indica se a coluna de ID já está no formato uint64."""
+    return coluna_id in df.columns and df[coluna_id].dtype == np.uint64
+
+
+def verificar_colisoes(df, colunas, coluna_id='ID_UNICO'):
+    """
+    Procura IDs iguais gerados por chaves diferentes.
+
+    Returns:
+        pd.DataFrame: as chaves distintas que compartilham um mesmo ID (vazio se não houver colisão)
+    """
+    chaves = _normalizar_chaves(df, colunas)
+    chaves[coluna_id] = df[coluna_id].to_numpy()
+    distintas = chaves.drop_duplicates()
+    return distintas[distintas[coluna_id].duplicated(keep=False)].sort_values(coluna_id)
+
+
+def migrar_ids_parquet(caminho, nome):
+    """
+    Recalcula o ID_UNICO de um Parquet consolidado no formato uint64.
+
+    Linhas que passam a ter o mesmo ID (mesma chave) são deduplicadas mantendo a
+    primeira ocorrência. O arquivo é regravado de forma atômica.
+
+    Returns:
+        tuple: (linhas antes, linhas depois, quantidade de colisões)
+    """
+    df = pd.read_parquet(caminho)
+    linhas_antes = len(df)
+    df['ID_UNICO'] = gerar_ids(df, CHAVES_ID[nome])
+
+    colisoes = verificar_colisoes(df, CHAVES_ID[nome])
+    if not colisoes.empty:
+        logging.error(f"{caminho}: {colisoes['ID_UNICO'].nunique()} IDs com colisão de hash")
+
+    df = df.drop_duplicates(subset=['ID_UNICO'], keep='first')
+
+    diretorio = os.path.dirname(os.path.abspath(caminho))
+    fd, temporario = tempfile.mkstemp(dir=diretorio, prefix='.tmp-', suffix='.parquet')
+    os.close(fd)
+    try:
+        df.to_parquet(temporario, index=False, engine='pyarrow')
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+    return linhas_antes, len(df), colisoes['ID_UNICO'].nunique()
+
+
+if __name__ == '__main__':
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for nome, arquivo in ARQUIVOS_CONSOLIDADOS.items():
+        caminho = os.path.join(raiz, arquivo)
+        if not os.path.exists(caminho):
+            continue
+        antes, depois, colisoes = migrar_ids_parquet(caminho, nome)
+        print(f"{arquivo}: {antes} -> {depois} linhas, {colisoes} colisões")
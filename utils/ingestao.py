@@ -0,0 +1,410 @@
+"""
+Ingestão das planilhas no consolidado.
+
+Baixa cada planilha do Google Sheets (com revalidação condicional em
+utils.download), lê com o leitor configurado em config.json, aplica a limpeza
+do conjunto de dados e incorpora as linhas novas ou alteradas ao consolidado
+(utils.consolidacao). As páginas não chamam este módulo diretamente: elas leem
+o consolidado pelo registro (utils.datasets), e a ingestão roda à parte, pela
+thread de utils.atualizacao.
+
+Cada versão limpa também é gravada como snapshot Parquet (utils.snapshots),
+chaveada pelo hash do conteúdo e por VERSAO_PIPELINE, para que a mesma planilha
+não precise ser processada de novo.
+
+Cada ingestão roda uma única vez por conjunto de dados (utils.singleflight):
+chamadas simultâneas aguardam a que já está em andamento, e um lock de arquivo
+faz com que vários processos do mesmo servidor compartilhem a mesma ingestão.
+
+A ingestão também pode rodar fora do dashboard (cron, agendador etc.), sem
+importar o Streamlit, com o tempo de cada etapa:
+    python -m utils.ingestao --all
+    python -m utils.ingestao cabotagem --arquivo cabotagem.xlsx
+    python -m utils.ingestao importacao --url "https://..."
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import time
+from functools import partial
+import pandas as pd
+from utils import consolidacao
+from utils.data_processing import carregar_em_paralelo
+from utils.download import DIRETORIO_CACHE, Download, baixar_com_cache, ler_metadados
+from utils.snapshots import chave_snapshot, ler_snapshot, salvar_snapshot
+from utils.parsers import PARSER_PADRAO, PARSERS, formato_parser, ler_conteudo
+from utils.singleflight import SingleFlight, TravaArquivo
+from utils.numeros import limpar_numeros, registrar_relatorio
+from utils.ids import CHAVES_ID, gerar_ids
+
+URL_EXPORTACAO = "https://docs.google.com/spreadsheets/d/{file_id}/export?format={formato}"
+CAMINHO_CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.json')
+# Incrementar sempre que a limpeza mudar, para invalidar os snapshots gravados
+VERSAO_PIPELINE = 6
+# Tempo máximo de espera por uma ingestão iniciada por outra sessão ou processo
+TIMEOUT_CARGA = 180
+# Uma revalidação feita por outro processo há menos que isso é reaproveitada
+JANELA_COMPARTILHAMENTO = 60
+DIRETORIO_LOCKS = os.path.join(os.path.dirname(DIRETORIO_CACHE), 'locks')
+
+
+class ErroDataset(Exception):
+    """Erro ao carregar ou validar um conjunto de dados."""
+
+
+def _normalizar_colunas(df, colunas_obrigatorias):
+    """Padroniza os nomes das colunas e valida as obrigatórias."""
+    if df.empty:
+        raise ErroDataset("A planilha está vazia.")
+
+    df.columns = df.columns.str.strip().str.upper()
+    missing_cols = [col for col in colunas_obrigatorias if col not in df.columns]
+    if missing_cols:
+        raise ErroDataset(f"Colunas ausentes: {', '.join(missing_cols)}")
+    return df
+
+
+def _limpar_coluna_numerica(df, coluna, nome):
+    """Limpa uma coluna numérica e registra no log os valores rejeitados."""
+    df[coluna], relatorio = limpar_numeros(df[coluna])
+    registrar_relatorio(relatorio, contexto=f"{nome}: ")
+
+
+def _limpar_importacao(df):
+    """Limpeza da planilha de importação."""
+    df = _normalizar_colunas(df, DATASETS['importacao']['colunas_obrigatorias'])
+    df['ETA'] = pd.to_datetime(df['ETA'], errors='coerce')
+    _limpar_coluna_numerica(df, 'QTDE CONTAINER', 'importacao')
+
+    df = df.dropna(subset=['ETA', 'UF CONSIGNATÁRIO', 'PORTO DESCARGA'])
+    if df.empty:
+        raise ErroDataset("Dados inválidos após processamento.")
+
+    df['ID_UNICO'] = gerar_ids(df, CHAVES_ID['importacao'])
+    return df
+
+
+def _limpar_exportacao(df):
+    """Limpeza da planilha de exportação."""
+    df = _normalizar_colunas(df, DATASETS['exportacao']['colunas_obrigatorias'])
+    df['DATA EMBARQUE'] = pd.to_datetime(df['DATA EMBARQUE'], errors='coerce')
+    _limpar_coluna_numerica(df, 'QTDE CONTEINER', 'exportacao')
+
+    df = df.dropna(subset=['DATA EMBARQUE', 'ESTADO EXPORTADOR', 'PORTO EMBARQUE'])
+    if df.empty:
+        raise ErroDataset("Dados inválidos após processamento.")
+
+    df = _derivar_exportacao(df)
+    df['ID_UNICO'] = gerar_ids(df, CHAVES_ID['exportacao'])
+    return df
+
+
+def _derivar_exportacao(df):
+    """
+    Colunas calculadas da exportação.
+
+    A antiga DATA EMBARQUE SIMPLIFICADA (objetos date do Python) é removida:
+    os filtros de período usam o índice de datas de utils.filtros.
+    """
+    return df.drop(columns=['DATA EMBARQUE SIMPLIFICADA'], errors='ignore')
+
+
+def _limpar_cabotagem(df):
+    """Limpeza da planilha de cabotagem."""
+    if df.empty:
+        raise ErroDataset("A planilha está vazia.")
+
+    missing_cols = [col for col in DATASETS['cabotagem']['colunas_obrigatorias'] if col not in df.columns]
+    if missing_cols:
+        raise ErroDataset(f"Colunas ausentes: {', '.join(missing_cols)}")
+
+    df['DATA DE EMBARQUE'] = pd.to_datetime(df['DATA DE EMBARQUE'], format='%Y-%m-%d', errors='coerce', dayfirst=True)
+    for col in ['QUANTIDADE C20', 'QUANTIDADE C40']:
+        _limpar_coluna_numerica(df, col, 'cabotagem')
+    df = _derivar_cabotagem(df)
+    df['ID_UNICO'] = gerar_ids(df, CHAVES_ID['cabotagem'])
+    return df
+
+
+def _derivar_cabotagem(df):
+    """
+    Colunas calculadas da cabotagem: quantidade total, UF de origem (do
+    'CIDADE - UF' do remetente) e de destino, mês e semana ISO do embarque.
+    """
+    df['QUANTIDADE TOTAL'] = df['QUANTIDADE C20'].fillna(0) + df['QUANTIDADE C40'].fillna(0)
+    df['ESTADO_ORIGEM'] = df['REMETENTE - CIDADE'].astype('string').str.rsplit('-', n=1).str[-1].str.strip()
+    df['ESTADO_DESTINO'] = df['DESTINATÁRIO - ESTADO']
+    datas = df['DATA DE EMBARQUE']
+    df['MES EMBARQUE'] = datas.dt.strftime('%Y-%m')
+    semana = datas.dt.isocalendar()
+    df['SEMANA EMBARQUE'] = semana['year'].astype('string') + '-W' + semana['week'].astype('string').str.zfill(2)
+    return df
+
+
+# Definição de cada conjunto de dados: chave em config.json, regras de leitura e limpeza.
+# 'derivar' recalcula as colunas derivadas, inclusive nos consolidados antigos importados;
+# 'categoricas' são as colunas derivadas que o registro mantém em memória como category.
+DATASETS = {
+    'importacao': {
+        'descricao': 'importação',
+        'coluna_data': 'ETA',
+        'colunas_obrigatorias': ['ETA', 'UF CONSIGNATÁRIO', 'PORTO DESCARGA', 'QTDE CONTAINER'],
+        'opcoes_leitura': {},
+        'limpar': _limpar_importacao,
+        'derivar': None,
+        'categoricas': []
+    },
+    'exportacao': {
+        'descricao': 'exportação',
+        'coluna_data': 'DATA EMBARQUE',
+        'colunas_obrigatorias': ['DATA EMBARQUE', 'ESTADO EXPORTADOR', 'QTDE CONTEINER', 'PORTO EMBARQUE'],
+        'opcoes_leitura': {},
+        'limpar': _limpar_exportacao,
+        'derivar': _derivar_exportacao,
+        'categoricas': []
+    },
+    'cabotagem': {
+        'descricao': 'cabotagem',
+        'coluna_data': 'DATA DE EMBARQUE',
+        'colunas_obrigatorias': ['DATA DE EMBARQUE', 'QUANTIDADE C20', 'QUANTIDADE C40'],
+        'opcoes_leitura': {'dtype': str},
+        'limpar': _limpar_cabotagem,
+        'derivar': _derivar_cabotagem,
+        'categoricas': ['ESTADO_ORIGEM', 'ESTADO_DESTINO', 'MES EMBARQUE', 'SEMANA EMBARQUE']
+    }
+}
+
+_single_flight = SingleFlight()
+# Hash da última planilha consolidada por este processo, por conjunto de dados
+_consolidados = {}
+
+
+def carregar_config():
+    """Lê o config.json do projeto."""
+    with open(CAMINHO_CONFIG, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def obter_file_id(nome):
+    """Retorna o ID da planilha do Google Sheets a partir da URL em config.json."""
+    url = carregar_config()['urls'][nome]
+    match = re.search(r'/d/([\w-]+)', url)
+    return match.group(1) if match else url
+
+
+def obter_parser(nome):
+    """Leitor de planilha configurado para o conjunto de dados no bloco "parsers" do config.json."""
+    return carregar_config().get('parsers', {}).get(nome, PARSER_PADRAO)
+
+
+def processar_conteudo(nome, conteudo, parser=None):
+    """Lê a planilha baixada com o leitor configurado e aplica a limpeza do conjunto de dados."""
+    definicao = DATASETS[nome]
+    parser = parser or obter_parser(nome)
+    df = ler_conteudo(conteudo, parser, **definicao['opcoes_leitura'])
+    return definicao['limpar'](df)
+
+
+def _url_dataset(nome):
+    if nome not in DATASETS:
+        raise KeyError(f"Conjunto de dados desconhecido: {nome}")
+    return URL_EXPORTACAO.format(
+        file_id=obter_file_id(nome),
+        formato=formato_parser(obter_parser(nome))
+    )
+
+
+def baixar_dataset(nome):
+    """Baixa a planilha do conjunto de dados, com revalidação condicional."""
+    return baixar_com_cache(nome, _url_dataset(nome))
+
+
+def carregar_dataset(nome):
+    """Baixa e limpa um conjunto de dados, sem passar pelo cache em memória."""
+    return processar_conteudo(nome, baixar_dataset(nome).conteudo)
+
+
+def _medir(tempos, etapa, funcao):
+    """Executa `funcao` somando sua duração em tempos[etapa]."""
+    inicio = time.perf_counter()
+    try:
+        return funcao()
+    finally:
+        tempos[etapa] = tempos.get(etapa, 0) + time.perf_counter() - inicio
+
+
+def _versao_parser(nome, parser=None):
+    """Versão usada nos snapshots: pipeline de limpeza e leitor configurado."""
+    return f"{VERSAO_PIPELINE}-{parser or obter_parser(nome)}"
+
+
+def _ler_ou_processar(nome, download, parser=None, tempos=None):
+    """Usa o snapshot Parquet do conteúdo baixado ou, se não houver, processa a planilha."""
+    tempos = {} if tempos is None else tempos
+    definicao = DATASETS[nome]
+    parser = parser or obter_parser(nome)
+    chave = chave_snapshot(download.hash, _versao_parser(nome, parser))
+    df = _medir(tempos, 'snapshot', lambda: ler_snapshot(nome, chave))
+    if df is None:
+        df = _medir(tempos, 'leitura', lambda: ler_conteudo(download.conteudo, parser, **definicao['opcoes_leitura']))
+        df = _medir(tempos, 'limpeza', lambda: definicao['limpar'](df))
+        _medir(tempos, 'snapshot', lambda: salvar_snapshot(nome, chave, df))
+    return df
+
+
+def ler_arquivo(caminho):
+    """Lê uma planilha local como um Download, para ingerir sem acessar a rede."""
+    with open(caminho, 'rb') as f:
+        conteudo = f.read()
+    return Download(conteudo, hashlib.sha256(conteudo).hexdigest(), True)
+
+
+def _obter_download(nome, url=None, arquivo=None):
+    if arquivo is not None:
+        return ler_arquivo(arquivo)
+    if url is not None:
+        # Cache separado, para não substituir o da planilha configurada
+        return baixar_com_cache(f"{nome}-manual", url)
+    return baixar_dataset(nome)
+
+
+def _revalidada_por_outro_processo(nome):
+    """
+    Indica se outro processo revalidou a planilha há pouco tempo.
+
+    Chamado com o lock de arquivo já adquirido: nesse caso a ingestão que ele
+    acabou de fazer é aproveitada, sem acessar a rede.
+    """
+    meta = ler_metadados(nome)
+    return bool(
+        meta.get('hash')
+        and meta.get('url') == _url_dataset(nome)
+        and time.time() - meta.get('verificado_em', 0) < JANELA_COMPARTILHAMENTO
+        and consolidacao.versao_consolidado(nome) is not None
+    )
+
+
+def _ingerir(nome, url=None, arquivo=None, parser=None, tempos=None):
+    tempos = {} if tempos is None else tempos
+    configurada = url is None and arquivo is None
+    with TravaArquivo(os.path.join(DIRETORIO_LOCKS, f"{nome}.lock"), timeout=TIMEOUT_CARGA):
+        if configurada and _consolidados.get(nome) is None and _revalidada_por_outro_processo(nome):
+            return None
+
+        consolidacao.importar_legado_se_necessario(nome, preparar=DATASETS[nome]['derivar'])
+        download = _medir(tempos, 'download', lambda: _obter_download(nome, url, arquivo))
+        if configurada and not download.alterado and _consolidados.get(nome) == download.hash:
+            return None
+
+        df = _ler_ou_processar(nome, download, parser, tempos)
+        resultado = _medir(tempos, 'consolidacao', lambda: consolidacao.consolidar(nome, df))
+        if configurada:
+            _consolidados[nome] = download.hash
+        return resultado
+
+
+def ingerir_dataset(nome, timeout=TIMEOUT_CARGA):
+    """
+    Baixa a planilha e incorpora as alterações ao consolidado.
+
+    Se a planilha não mudou desde a última ingestão, nada é lido nem gravado.
+    Chamadas simultâneas para o mesmo conjunto de dados, nesta ou em outras
+    sessões, aguardam a mesma execução e recebem o mesmo resultado ou erro.
+
+    Returns:
+        ResultadoConsolidacao, ou None se não houve alteração
+
+    Raises:
+        ErroDataset: se a planilha não puder ser validada ou a espera exceder o timeout
+    """
+    try:
+        return _single_flight.executar(nome, lambda: _ingerir(nome), timeout=timeout)
+    except TimeoutError as e:
+        raise ErroDataset(f"Tempo esgotado ao carregar {DATASETS[nome]['descricao']}.") from e
+
+
+def ingerir(nome, url=None, arquivo=None, parser=None):
+    """
+    Ingere um conjunto de dados a partir da planilha configurada, de uma URL ou
+    de um arquivo local, medindo o tempo de cada etapa.
+
+    Returns:
+        tuple: (ResultadoConsolidacao ou None se nada mudou, dict etapa -> segundos)
+    """
+    if nome not in DATASETS:
+        raise KeyError(f"Conjunto de dados desconhecido: {nome}")
+    tempos = {}
+    inicio = time.perf_counter()
+    resultado = _ingerir(nome, url, arquivo, parser, tempos)
+    tempos['total'] = time.perf_counter() - inicio
+    return resultado, tempos
+
+
+def _parser_para_arquivo(nome, arquivo, parser):
+    """Escolhe um leitor compatível com a extensão do arquivo local, se não for informado."""
+    if parser or arquivo is None:
+        return parser
+    formato = 'csv' if arquivo.lower().endswith('.csv') else 'xlsx'
+    configurado = obter_parser(nome)
+    if formato_parser(configurado) == formato:
+        return configurado
+    return next(p for p in PARSERS if formato_parser(p) == formato)
+
+
+ETAPAS = ['download', 'snapshot', 'leitura', 'limpeza', 'consolidacao', 'total']
+
+
+def main():
+    parser_args = argparse.ArgumentParser(
+        description="Ingere as planilhas no consolidado, sem o Streamlit."
+    )
+    parser_args.add_argument('nomes', nargs='*', metavar='dataset',
+                             help=f"conjuntos de dados a ingerir ({', '.join(DATASETS)})")
+    parser_args.add_argument('--all', action='store_true', help="ingere todos os conjuntos de dados")
+    origem = parser_args.add_mutually_exclusive_group()
+    origem.add_argument('--url', help="URL da planilha, em vez da configurada em config.json")
+    origem.add_argument('--arquivo', help="planilha local (xlsx ou csv)")
+    parser_args.add_argument('--parser', choices=list(PARSERS), help="leitor de planilha")
+    parser_args.add_argument('--processos', type=int, default=len(DATASETS),
+                             help="processos usados com mais de um conjunto de dados")
+    args = parser_args.parse_args()
+
+    nomes = list(DATASETS) if args.all else args.nomes
+    if not nomes:
+        parser_args.error("informe os conjuntos de dados ou --all")
+    desconhecidos = [nome for nome in nomes if nome not in DATASETS]
+    if desconhecidos:
+        parser_args.error(f"conjunto de dados desconhecido: {', '.join(desconhecidos)}")
+    if (args.url or args.arquivo) and len(nomes) > 1:
+        parser_args.error("--url e --arquivo valem para um único conjunto de dados")
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    parser = _parser_para_arquivo(nomes[0], args.arquivo, args.parser)
+    carregadores = {
+        nome: partial(ingerir, nome, args.url, args.arquivo, parser)
+        for nome in nomes
+    }
+    dados, erros, _ = carregar_em_paralelo(
+        carregadores, max_workers=args.processos, usar_processos=len(nomes) > 1
+    )
+
+    print(f"{'dataset':<12}" + ''.join(f"{etapa:>14}" for etapa in ETAPAS) + "  resultado")
+    for nome in nomes:
+        if nome in erros:
+            print(f"{nome:<12}" + ''.join(f"{'-':>14}" for _ in ETAPAS) + f"  erro: {erros[nome]}")
+            continue
+        resultado, tempos = dados[nome]
+        situacao = (
+            "sem alterações" if resultado is None else
+            f"{resultado.novos} novos, {resultado.alterados} alterados, {resultado.total} registros"
+        )
+        print(f"{nome:<12}" + ''.join(f"{tempos.get(etapa, 0):14.2f}" for etapa in ETAPAS) + f"  {situacao}")
+    sys.exit(1 if erros else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Cache LRU limitado por memória, compartilhado entre as sessões do processo.
+
+Cada entrada guarda o tamanho estimado do valor em bytes; quando o total passa
+do limite, as entradas usadas há mais tempo são descartadas. Os acertos e as
+falhas são contados para acompanhar a eficácia do cache.
+"""
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+
+def tamanho_em_bytes(valor):
+    """Tamanho aproximado de um valor em memória (arrays, DataFrames e tuplas, listas e dicionários deles)."""
+    if isinstance(valor, np.ndarray):
+        return valor.nbytes
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(index=True, deep=True).sum())
+    if isinstance(valor, pd.Series):
+        return int(valor.memory_usage(index=True, deep=True))
+    if isinstance(valor, (tuple, list)):
+        return sys.getsizeof(valor) + sum(tamanho_em_bytes(item) for item in valor)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(
+            tamanho_em_bytes(chave) + tamanho_em_bytes(item) for chave, item in valor.items()
+        )
+    return sys.getsizeof(valor)
+
+
+class CacheLRU:
+    """Cache LRU com limite total em bytes."""
+
+    def __init__(self, limite_bytes):
+        self.limite_bytes = limite_bytes
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()
+        self._bytes = 0
+        self.acertos = 0
+        self.falhas = 0
+
+    def obter(self, chave, construtor):
+        """
+        Retorna o valor da chave, calculando-o com `construtor` se não estiver no cache.
+
+        Valores maiores que o limite são retornados sem serem guardados.
+        """
+        with self._lock:
+            if chave in self._entradas:
+                self._entradas.move_to_end(chave)
+                self.acertos += 1
+                return self._entradas[chave][0]
+            self.falhas += 1
+
+        valor = construtor()
+        tamanho = tamanho_em_bytes(valor)
+        if tamanho > self.limite_bytes:
+            return valor
+
+        with self._lock:
+            if chave in self._entradas:
+                return self._entradas[chave][0]
+            self._entradas[chave] = (valor, tamanho)
+            self._bytes += tamanho
+            while self._bytes > self.limite_bytes:
+                _, (_, removido) = self._entradas.popitem(last=False)
+                self._bytes -= removido
+        return valor
+
+    def limpar(self):
+        """Descarta todas as entradas (as estatísticas são mantidas)."""
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def estatisticas(self):
+        """
+        Returns:
+            dict: entradas, bytes, limite_bytes, acertos, falhas e taxa_acerto (0 a 1)
+        """
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                'entradas': len(self._entradas),
+                'bytes': self._bytes,
+                'limite_bytes': self.limite_bytes,
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': self.acertos / consultas if consultas else 0.0
+            }
@@ -0,0 +1,120 @@
+"""
+Limpeza vetorizada de colunas numéricas no formato brasileiro.
+
+Substitui o .apply(limpar_numero) célula a célula por kernels de string do
+Arrow aplicados à coluna inteira. Valores que não podem ser convertidos
+viram o valor padrão e são resumidos em um relatório, em vez de gerar uma
+mensagem por célula.
+"""
+import logging
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+RelatorioNumeros = namedtuple('RelatorioNumeros', ['coluna', 'total', 'rejeitados', 'exemplos'])
+
+_REGEX_MILHAR = r'^-?\d{1,3}(?:\.\d{3}){2,}$'
+_REGEX_BRASILEIRO = r'^[-+]?\d{1,3}(?:\.\d{3})+(?:,\d+)?$'
+_REGEX_AMERICANO = r'^[-+]?\d{1,3}(?:,\d{3})+(?:\.\d+)?$'
+_REGEX_NUMERO = r'^[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?$'
+
+
+def limpar_numeros(serie, valor_padrao=0, max_exemplos=10):
+    """
+    Converte uma coluna de números em formato brasileiro para float.
+
+    Regras:
+        - '1.234,56' e '1234,56': vírgula decimal, ponto como separador de milhar
+        - '1.234.567': apenas pontos em grupos de três, separador de milhar
+        - '1,234.56': com os dois separadores na ordem americana (vírgula em
+          grupos de três antes do ponto), a vírgula é separador de milhar
+        - com os dois separadores fora desses formatos, o valor é rejeitado
+        - '2.5', '3' e valores já numéricos são mantidos
+        - vazios e nulos viram valor_padrao sem serem considerados rejeitados
+
+    Args:
+        serie (pd.Series): coluna a limpar
+        valor_padrao (float): valor usado para vazios e valores inválidos
+        max_exemplos (int): quantidade máxima de valores rejeitados no relatório
+
+    Returns:
+        tuple: (pd.Series de float, RelatorioNumeros)
+    """
+    if pd.api.types.is_numeric_dtype(serie):
+        numeros = serie.astype(float)
+        return numeros.fillna(valor_padrao), RelatorioNumeros(serie.name, len(serie), 0, [])
+
+    texto = pc.utf8_trim_whitespace(pa.array(serie.astype('string[pyarrow]')))
+    vazio = np.asarray(pc.fill_null(pc.equal(texto, ''), True), dtype=bool)
+
+    # Com vírgula (ou só pontos em grupos de milhar), o ponto é separador de milhar.
+    # A regex de milhar só é avaliada nos valores com dois pontos ou mais.
+    sem_ponto = np.asarray(pc.fill_null(pc.match_substring(texto, ','), False), dtype=bool)
+    com_ponto = np.asarray(pc.fill_null(pc.match_substring(texto, '.'), False), dtype=bool)
+
+    # Com os dois separadores, o formato decide qual é o de milhar; valores
+    # que não seguem nenhum dos dois formatos são rejeitados
+    americano = np.zeros(len(texto), dtype=bool)
+    ambiguo = np.zeros(len(texto), dtype=bool)
+    dois_separadores = np.flatnonzero(sem_ponto & com_ponto)
+    if len(dois_separadores):
+        subconjunto = texto.take(dois_separadores)
+        americano[dois_separadores] = np.asarray(pc.fill_null(
+            pc.match_substring_regex(subconjunto, _REGEX_AMERICANO), False
+        ), dtype=bool)
+        ambiguo[dois_separadores] = ~americano[dois_separadores] & ~np.asarray(pc.fill_null(
+            pc.match_substring_regex(subconjunto, _REGEX_BRASILEIRO), False
+        ), dtype=bool)
+        sem_ponto &= ~americano
+        texto = pc.if_else(pa.array(americano), pc.replace_substring(texto, ',', ''), texto)
+
+    varios_pontos = np.flatnonzero(np.asarray(pc.fill_null(
+        pc.greater_equal(pc.count_substring(texto, '.'), 2), False
+    ), dtype=bool))
+    if len(varios_pontos):
+        sem_ponto[varios_pontos] |= np.asarray(pc.fill_null(
+            pc.match_substring_regex(texto.take(varios_pontos), _REGEX_MILHAR), False
+        ), dtype=bool)
+    texto = pc.if_else(pa.array(sem_ponto), pc.replace_substring(texto, '.', ''), texto)
+    texto = pc.replace_substring(texto, ',', '.')
+
+    # Caminho rápido: dígitos com sinal e um ponto opcional; a regex completa
+    # (notação científica etc.) só é usada no que sobrar
+    sem_decimal = pc.replace_substring(texto, '.', '', max_replacements=1)
+    digitos = pc.utf8_ltrim(sem_decimal, characters='+-')
+    valido = np.asarray(pc.fill_null(pc.and_(
+        pc.ascii_is_decimal(digitos),
+        pc.less_equal(pc.subtract(pc.utf8_length(sem_decimal), pc.utf8_length(digitos)), 1)
+    ), False), dtype=bool)
+    valido &= ~ambiguo
+    restantes = np.flatnonzero(~valido & ~vazio & ~ambiguo)
+    if len(restantes):
+        valido[restantes] = np.asarray(pc.fill_null(
+            pc.match_substring_regex(texto.take(restantes), _REGEX_NUMERO), False
+        ), dtype=bool)
+
+    numeros = pc.cast(pc.if_else(pa.array(valido), texto, pa.scalar(None, pa.string())), pa.float64())
+    numeros = pd.Series(
+        numeros.to_numpy(zero_copy_only=False),
+        index=serie.index, name=serie.name, dtype=float
+    )
+
+    rejeitados = ~valido & ~vazio
+    quantidade_rejeitados = int(rejeitados.sum())
+    exemplos = []
+    if quantidade_rejeitados:
+        exemplos = serie[rejeitados].astype(str).unique()[:max_exemplos].tolist()
+
+    relatorio = RelatorioNumeros(serie.name, len(serie), quantidade_rejeitados, exemplos)
+    return numeros.fillna(valor_padrao), relatorio
+
+
+def registrar_relatorio(relatorio, contexto=''):
+    """Registra no log um resumo dos valores rejeitados, se houver."""
+    if relatorio.rejeitados:
+        logging.warning(
+            f"{contexto}{relatorio.coluna}: {relatorio.rejeitados} de {relatorio.total} valores "
+            f"não numéricos convertidos para 0 (ex.: {', '.join(relatorio.exemplos)})"
+        )
@@ -0,0 +1,111 @@
+"""
+Leitores de planilha intercambiáveis.
+
+O leitor de cada conjunto de dados é escolhido no bloco "parsers" do
+config.json. Todos recebem o conteúdo baixado e retornam um DataFrame com o
+mesmo formato do pd.read_excel padrão, para que a limpeza seja a mesma
+qualquer que seja o leitor:
+
+- openpyxl: pd.read_excel com o engine padrão
+- openpyxl_readonly: openpyxl em modo somente leitura, linha a linha
+- calamine: pd.read_excel com engine='calamine' (requer python-calamine)
+- csv_pyarrow: exportação CSV da planilha lida pelo leitor multithread do pyarrow
+"""
+import csv
+import io
+from io import BytesIO
+import pandas as pd
+
+PARSER_PADRAO = 'openpyxl'
+
+
+def _como_texto(df):
+    """Converte os valores não nulos para str, como pd.read_excel(dtype=str)."""
+    return df.apply(lambda serie: serie.where(serie.isna(), serie.astype(str)).astype(object))
+
+
+def _ler_openpyxl(conteudo, dtype=None):
+    return pd.read_excel(BytesIO(conteudo), engine='openpyxl', dtype=dtype)
+
+
+def _converter_celula(valor):
+    """Mesma conversão de células que o pandas aplica ao ler com openpyxl."""
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    if valor == '':
+        return None
+    return valor
+
+
+def _ler_openpyxl_readonly(conteudo, dtype=None):
+    from openpyxl import load_workbook
+    from pandas.io.parsers import TextParser
+
+    workbook = load_workbook(BytesIO(conteudo), read_only=True, data_only=True)
+    try:
+        linhas = [
+            [_converter_celula(valor) for valor in linha]
+            for linha in workbook.worksheets[0].iter_rows(values_only=True)
+        ]
+    finally:
+        workbook.close()
+
+    # Linhas vazias no fim da planilha são descartadas pelo pd.read_excel
+    while linhas and all(valor is None for valor in linhas[-1]):
+        linhas.pop()
+    if not linhas:
+        return pd.DataFrame()
+
+    # Mesma inferência de tipos usada internamente pelo pd.read_excel
+    return TextParser(linhas, header=0, dtype=dtype).read()
+
+
+def _ler_calamine(conteudo, dtype=None):
+    try:
+        return pd.read_excel(BytesIO(conteudo), engine='calamine', dtype=dtype)
+    except ImportError as e:
+        raise ImportError("O leitor 'calamine' requer o pacote python-calamine.") from e
+
+
+def _ler_csv_pyarrow(conteudo, dtype=None):
+    import pyarrow.csv as pacsv
+
+    convert_options = pacsv.ConvertOptions(strings_can_be_null=True)
+    if dtype is str:
+        primeira_linha = io.StringIO(conteudo.decode('utf-8-sig', errors='replace'))
+        cabecalho = next(csv.reader(primeira_linha), [])
+        convert_options = pacsv.ConvertOptions(
+            strings_can_be_null=True,
+            column_types={nome: 'string' for nome in cabecalho}
+        )
+
+    tabela = pacsv.read_csv(
+        BytesIO(conteudo),
+        read_options=pacsv.ReadOptions(use_threads=True),
+        convert_options=convert_options
+    )
+    df = tabela.to_pandas()
+    return _como_texto(df) if dtype is str else df
+
+
+# Leitor -> formato de exportação da planilha e função de leitura
+PARSERS = {
+    'openpyxl': {'formato': 'xlsx', 'ler': _ler_openpyxl},
+    'openpyxl_readonly': {'formato': 'xlsx', 'ler': _ler_openpyxl_readonly},
+    'calamine': {'formato': 'xlsx', 'ler': _ler_calamine},
+    'csv_pyarrow': {'formato': 'csv', 'ler': _ler_csv_pyarrow}
+}
+
+
+def formato_parser(parser):
+    """Formato de exportação ('xlsx' ou 'csv') exigido pelo leitor."""
+    if parser not in PARSERS:
+        raise ValueError(f"Leitor de planilha desconhecido: {parser}")
+    return PARSERS[parser]['formato']
+
+
+def ler_conteudo(conteudo, parser=PARSER_PADRAO, dtype=None):
+    """Lê o conteúdo baixado com o leitor informado e retorna o DataFrame."""
+    if parser not in PARSERS:
+        raise ValueError(f"Leitor de planilha desconhecido: {parser}")
+    return PARSERS[parser]['ler'](conteudo, dtype=dtype)
@@ -0,0 +1,133 @@
+"""
+Execução única (single-flight) de carregamentos concorrentes.
+
+SingleFlight garante que, dentro de um processo, apenas uma chamada por chave
+execute de fato; as demais aguardam e recebem o mesmo resultado ou a mesma
+exceção. TravaArquivo estende a ideia para vários processos no mesmo servidor,
+usando um lock de arquivo do sistema operacional.
+"""
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class _Chamada:
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+        self.erro = None
+
+
+class SingleFlight:
+    """Agrupa chamadas simultâneas com a mesma chave em uma única execução."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._chamadas = {}
+
+    def em_andamento(self, chave):
+        """Indica se há uma execução em curso para a chave."""
+        with self._lock:
+            return chave in self._chamadas
+
+    def executar(self, chave, funcao, timeout=None):
+        """
+        Executa `funcao` uma única vez por chave entre as chamadas simultâneas.
+
+        Args:
+            chave: identificador da operação (ex.: nome do conjunto de dados)
+            funcao (callable): função sem argumentos a executar
+            timeout (float): segundos máximos de espera pelo resultado de outra chamada
+
+        Returns:
+            O resultado de `funcao`
+
+        Raises:
+            TimeoutError: se a execução em curso não terminar dentro do timeout
+            Exception: a mesma exceção levantada por `funcao`
+        """
+        with self._lock:
+            chamada = self._chamadas.get(chave)
+            lider = chamada is None
+            if lider:
+                chamada = self._chamadas[chave] = _Chamada()
+
+        if lider:
+            try:
+                chamada.resultado = funcao()
+            except BaseException as e:
+                chamada.erro = e
+            finally:
+                with self._lock:
+                    del self._chamadas[chave]
+                chamada.evento.set()
+        elif not chamada.evento.wait(timeout):
+            raise TimeoutError(f"Tempo esgotado aguardando o carregamento de {chave}")
+
+        if chamada.erro is not None:
+            raise chamada.erro
+        return chamada.resultado
+
+
+class TravaArquivo:
+    """
+    Lock exclusivo entre processos baseado em arquivo.
+
+    Uso:
+        with TravaArquivo('/tmp/importacao.lock', timeout=120):
+            ...
+    """
+
+    def __init__(self, caminho, timeout=None, intervalo=0.1):
+        self.caminho = caminho
+        self.timeout = timeout
+        self.intervalo = intervalo
+        self._arquivo = None
+
+    def _tentar_travar(self):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._arquivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                self._arquivo.seek(0)
+                msvcrt.locking(self._arquivo.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def adquirir(self):
+        os.makedirs(os.path.dirname(self.caminho) or '.', exist_ok=True)
+        self._arquivo = open(self.caminho, 'a+')
+        limite = None if self.timeout is None else time.monotonic() + self.timeout
+        while not self._tentar_travar():
+            if limite is not None and time.monotonic() >= limite:
+                self._arquivo.close()
+                self._arquivo = None
+                raise TimeoutError(f"Tempo esgotado aguardando o lock {self.caminho}")
+            time.sleep(self.intervalo)
+
+    def liberar(self):
+        if self._arquivo is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._arquivo.fileno(), fcntl.LOCK_UN)
+            else:
+                self._arquivo.seek(0)
+                msvcrt.locking(self._arquivo.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._arquivo.close()
+            self._arquivo = None
+
+    def __enter__(self):
+        self.adquirir()
+        return self
+
+    def __exit__(self, *exc):
+        self.liberar()
@@ -0,0 +1,92 @@
+"""
+Snapshots em Parquet dos conjuntos de dados já limpos.
+
+Cada snapshot é identificado pelo hash do conteúdo baixado e pela versão do
+pipeline de limpeza. Reinícios do servidor e novos processos leem o Parquet em
+vez de reprocessar o xlsx. A gravação é atômica e, ao salvar uma nova versão,
+as anteriores do mesmo conjunto de dados são removidas.
+"""
+import glob
+import logging
+import os
+import tempfile
+import pandas as pd
+
+DIRETORIO_SNAPSHOTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'snapshots')
+
+
+def preparar_para_parquet(df):
+    """
+    Converte para texto as colunas de objeto com tipos misturados (ex.: números
+    e textos na mesma coluna da planilha), que o pyarrow não consegue gravar.
+    """
+    colunas_mistas = [
+        coluna for coluna in df.columns
+        if df[coluna].dtype == object
+        and pd.api.types.infer_dtype(df[coluna], skipna=True).startswith('mixed')
+    ]
+    if not colunas_mistas:
+        return df
+    df = df.copy()
+    for coluna in colunas_mistas:
+        df[coluna] = df[coluna].where(df[coluna].isna(), df[coluna].astype(str))
+    return df
+
+
+def chave_snapshot(hash_conteudo, versao_pipeline):
+    """Monta a chave do snapshot a partir do hash do conteúdo e da versão do pipeline."""
+    return f"v{versao_pipeline}-{hash_conteudo}"
+
+
+def _caminho(nome, chave, diretorio):
+    return os.path.join(diretorio, f"{nome}-{chave}.parquet")
+
+
+def ler_snapshot(nome, chave, diretorio=None):
+    """Retorna o DataFrame do snapshot, ou None se ele não existir ou estiver ilegível."""
+    diretorio = diretorio or DIRETORIO_SNAPSHOTS
+    caminho = _caminho(nome, chave, diretorio)
+    if not os.path.exists(caminho):
+        return None
+    try:
+        return pd.read_parquet(caminho, engine='pyarrow')
+    except Exception as e:
+        logging.error(f"Snapshot inválido de {nome} ({caminho}): {e}")
+        return None
+
+
+def salvar_snapshot(nome, chave, df, diretorio=None):
+    """
+    Grava o snapshot de forma atômica e remove as versões anteriores.
+
+    Returns:
+        bool: True se o snapshot foi gravado
+    """
+    diretorio = diretorio or DIRETORIO_SNAPSHOTS
+    os.makedirs(diretorio, exist_ok=True)
+    caminho = _caminho(nome, chave, diretorio)
+    fd, temporario = tempfile.mkstemp(dir=diretorio, prefix='.tmp-', suffix='.parquet')
+    os.close(fd)
+    try:
+        preparar_para_parquet(df).to_parquet(temporario, index=False, engine='pyarrow')
+        os.replace(temporario, caminho)
+    except Exception as e:
+        logging.error(f"Erro ao salvar snapshot de {nome}: {e}")
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        return False
+
+    remover_antigos(nome, manter=chave, diretorio=diretorio)
+    return True
+
+
+def remover_antigos(nome, manter=None, diretorio=None):
+    """Remove os snapshots do conjunto de dados, exceto o da chave informada."""
+    diretorio = diretorio or DIRETORIO_SNAPSHOTS
+    manter_caminho = _caminho(nome, manter, diretorio) if manter else None
+    for caminho in glob.glob(os.path.join(diretorio, f"{nome}-*.parquet")):
+        if caminho != manter_caminho:
+            try:
+                os.remove(caminho)
+            except OSError as e:
+                logging.error(f"Erro ao remover snapshot {caminho}: {e}")
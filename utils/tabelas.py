@@ -0,0 +1,107 @@
+"""
+Tabelas dinâmicas e tabelas de detalhes das páginas, sem dependência do Streamlit.
+"""
+import pandas as pd
+
+
+def formatar_quantidade(serie):
+    """Formata quantidades inteiras com separador de milhar; zero ou negativo vira '-'."""
+    valores = serie.fillna(0)
+    return valores.astype(int).map(lambda x: f"{x:,}").where(valores > 0, "-")
+
+
+def pivot_por_data(df, coluna_data, colunas, coluna_valor, cabecalho, decrescente=False):
+    """
+    Soma `coluna_valor` por data (linhas) e pelas duas colunas de `colunas`,
+    com uma coluna TOTAL no fim.
+
+    Args:
+        df (pd.DataFrame): dados já filtrados
+        coluna_data (str): coluna de data das linhas
+        colunas (list): as duas colunas do cabeçalho (ex.: UF e porto)
+        coluna_valor (str): coluna somada
+        cabecalho (tuple): rótulo de dois níveis da coluna de datas
+        decrescente (bool): ordena as datas da mais recente para a mais antiga
+
+    Returns:
+        pd.DataFrame: tabela com colunas em MultiIndex de dois níveis
+    """
+    tabela = df.pivot_table(
+        index=coluna_data,
+        columns=colunas,
+        values=coluna_valor,
+        aggfunc='sum'
+    ).fillna(0)
+    tabela["TOTAL"] = tabela.sum(axis=1)
+
+    tabela.index.name = "DATA"
+    tabela = tabela.reset_index()
+    tabela.columns = pd.MultiIndex.from_tuples(
+        [cabecalho] +
+        [(col[0], col[1]) for col in tabela.columns[1:-1]] +
+        [("TOTAL", "TOTAL")],
+        names=["", ""]
+    )
+    if decrescente:
+        tabela = tabela.sort_values(by=cabecalho, ascending=False)
+    return tabela
+
+
+def manter_maiores(df, coluna, coluna_valor, limite, outros="OUTROS"):
+    """
+    Cópia de `df` em que os valores de `coluna` fora dos `limite` de maior soma
+    de `coluna_valor` (e os vazios) são trocados por `outros`, para limitar as
+    colunas de uma tabela dinâmica por uma dimensão com muitos valores.
+    """
+    maiores = df.groupby(coluna)[coluna_valor].sum().nlargest(limite).index
+    return df.assign(**{coluna: df[coluna].where(df[coluna].isin(maiores), outros)})
+
+
+def tabela_detalhes(df, colunas, coluna_data, coluna_quantidade):
+    """Seleciona as colunas de detalhes existentes e formata a data e a quantidade para exibição."""
+    tabela = df[[col for col in colunas if col in df.columns]].copy()
+    if coluna_data in tabela.columns:
+        tabela[coluna_data] = tabela[coluna_data].dt.strftime('%d/%m/%Y')
+    if coluna_quantidade in tabela.columns:
+        tabela[coluna_quantidade] = formatar_quantidade(tabela[coluna_quantidade])
+    return tabela
+
+
+def pagina_de_posicoes(posicoes, pagina, linhas_por_pagina):
+    """
+    Recorte de uma página das posições filtradas.
+
+    Args:
+        posicoes (np.ndarray): posições (iloc) do resultado, na ordem de exibição
+        pagina (int): número da página, a partir de 1 (limitado ao intervalo válido)
+        linhas_por_pagina (int): linhas em cada página
+
+    Returns:
+        tuple: (posições da página, página efetiva, total de páginas)
+    """
+    total_paginas = max(1, -(-len(posicoes) // linhas_por_pagina))
+    pagina = min(max(1, int(pagina)), total_paginas)
+    inicio = (pagina - 1) * linhas_por_pagina
+    return posicoes[inicio:inicio + linhas_por_pagina], pagina, total_paginas
+
+
+def resumo_cabotagem(df, view_type='destinatario'):
+    """
+    Total de contêineres de cabotagem por data e estado do destinatário
+    ('destinatario') ou cidade do remetente ('remetente').
+
+    Returns:
+        pd.DataFrame: uma linha por data (mais recente primeiro) e uma coluna TOTAL
+    """
+    coluna = 'DESTINATÁRIO - ESTADO' if view_type == 'destinatario' else 'REMETENTE - CIDADE'
+    validos = df.dropna(subset=['DATA DE EMBARQUE', 'QUANTIDADE TOTAL'])
+
+    tabela = validos.pivot_table(
+        index='DATA DE EMBARQUE', columns=coluna, values='QUANTIDADE TOTAL', aggfunc='sum'
+    ).fillna(0)
+    tabela.columns.name = coluna
+    tabela['TOTAL'] = tabela.sum(axis=1)
+
+    resumo = tabela.reset_index().sort_values('DATA DE EMBARQUE', ascending=False)
+    resumo['DATA DE EMBARQUE'] = resumo['DATA DE EMBARQUE'].dt.strftime('%d/%m/%Y')
+    return resumo